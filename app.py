@@ -1,24 +1,123 @@
 #!/usr/bin/env python3
 
+import ast
 from collections import namedtuple
 from importlib import import_module
+import os
 from pathlib import Path
+from threading import Lock
+from time import perf_counter
 
 from flask import abort, Flask, render_template, send_from_directory, url_for, redirect
 
-IGNORE_DIRS = ['blueprint_template', 'static', 'templates']
+from appoxy import metrics, recorder
+from appoxy.assets import assets
+
+IGNORE_DIRS = ['appoxy', 'benchmarks', 'blueprint_template', 'build', 'static', 'templates']
+
+LAZY_APPLETS = os.environ.get('APPOXY_LAZY_APPLETS', '') not in ('', '0')
+
+Applet = namedtuple('Applet', ('name', 'url', 'doc'))
 
 app = Flask(__name__)
+metrics.init_app(app)
+recorder.init_app(app)
+assets.init_app(app)
 
 modules = {}
+import_times = {}
+
+
+def read_manifest():
+    """Describe every applet without importing it.
+
+    Returns:
+        Dict[str, Applet]: The applets, keyed by name.
+    """
+    manifest = {}
+    for module_path in Path(__file__).expanduser().resolve().parent.glob('*/__init__.py'):
+        module_name = module_path.parent.name
+        if module_name in IGNORE_DIRS:
+            continue
+        doc = ast.get_docstring(ast.parse(module_path.read_text())) or ''
+        manifest[module_name] = Applet(module_name, f'/{module_name}/', doc.strip().splitlines()[0])
+    return manifest
 
-for module_path in Path(__file__).expanduser().resolve().parent.glob('*/__init__.py'):
-    module_name = module_path.parent.name
-    if module_name in IGNORE_DIRS:
-        continue
+
+def load_applet(module_name):
+    """Import an applet and record how long the import took.
+
+    Parameters:
+        module_name (str): The name of the applet package.
+
+    Returns:
+        flask.Blueprint: The blueprint of the applet.
+    """
+    start = perf_counter()
     module = import_module(module_name)
+    import_times[module_name] = perf_counter() - start
+    app.logger.info(f'imported {module_name} in {import_times[module_name]:.3f}s')
     modules[module_name] = module
-    app.register_blueprint(getattr(module, module_name))
+    return getattr(module, module_name)
+
+
+def create_applet_app(module_name):
+    """Create a stand-alone app that serves a single applet.
+
+    Parameters:
+        module_name (str): The name of the applet package.
+
+    Returns:
+        flask.Flask: The app with only the applet registered.
+    """
+    applet_app = Flask(__name__)
+    metrics.init_app(applet_app)
+    recorder.init_app(applet_app)
+    assets.init_app(applet_app)
+    applet_app.add_url_rule('/<applet>/static/<filename>', view_func=get_app_resource)
+    applet_app.register_blueprint(load_applet(module_name))
+    return applet_app
+
+
+@metrics.collector
+def _import_samples():
+    # type: () -> List[str]
+    return metrics.samples(
+        'appoxy_applet_import_seconds',
+        'Time taken to import each applet.',
+        'gauge',
+        {(name,): seconds for name, seconds in import_times.items()},
+        ('applet',),
+    )
+
+
+class LazyApplets:
+    """WSGI middleware that imports each applet on its first request."""
+
+    def __init__(self, wsgi_app, manifest):
+        self.wsgi_app = wsgi_app
+        self.manifest = manifest
+        self.applet_apps = {}
+        self.lock = Lock()
+
+    def __call__(self, environ, start_response):
+        name = environ.get('PATH_INFO', '').lstrip('/').split('/', maxsplit=1)[0]
+        if name not in self.manifest:
+            return self.wsgi_app(environ, start_response)
+        if name not in self.applet_apps:
+            with self.lock:
+                if name not in self.applet_apps:
+                    self.applet_apps[name] = create_applet_app(name)
+        return self.applet_apps[name](environ, start_response)
+
+
+manifest = read_manifest()
+
+if LAZY_APPLETS:
+    app.wsgi_app = LazyApplets(app.wsgi_app, manifest)
+else:
+    for module_name in manifest:
+        app.register_blueprint(load_applet(module_name))
 
 
 @app.route('/static/<filename>')
@@ -35,15 +134,20 @@ def resources(filename):
 @app.route('/<applet>/static/<filename>')
 def get_app_resource(applet, filename):
     if filename.split('.')[-1] in ('css', 'js'):
-        print(applet)
         return send_from_directory(f'{applet}/static', filename)
     else:
         return abort(404)
 
 
+@app.route('/metrics')
+def get_metrics():
+    return metrics.exposition(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+
 @app.route('/')
 def root():
-    Applet = namedtuple('Applet', ('name', 'url', 'doc'))
+    if LAZY_APPLETS:
+        return render_template('index.html', applets=sorted(manifest.items()))
     applets = {}
     for rule in app.url_map.iter_rules():
         if not rule.endpoint.endswith('.root'):
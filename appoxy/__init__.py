@@ -0,0 +1 @@
+"""Infrastructure shared by the applets."""
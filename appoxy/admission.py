@@ -0,0 +1,152 @@
+"""Cost-based admission control for expensive endpoints.
+
+Each guarded endpoint has an estimator that guesses the cost of a request
+before doing any real work, and a policy that compares the estimate
+against thresholds to accept the request, queue it behind other expensive
+requests, degrade it to an approximate mode, or reject it outright.
+"""
+
+import math
+import os
+from collections import Counter, namedtuple
+from functools import wraps
+from threading import BoundedSemaphore, Lock
+
+from flask import request
+
+from .metrics import collector, samples
+
+ACCEPT = 'accept'
+QUEUE = 'queue'
+DEGRADE = 'degrade'
+REJECT = 'reject'
+
+EXPENSIVE_CONCURRENCY = int(os.environ.get('APPOXY_EXPENSIVE_CONCURRENCY', 2))
+QUEUE_TIMEOUT = float(os.environ.get('APPOXY_QUEUE_TIMEOUT', 10))
+
+expensive_lane = BoundedSemaphore(EXPENSIVE_CONCURRENCY)
+
+_decisions = Counter() # type: Counter[Tuple[str, str]]
+_lock = Lock()
+
+
+class AdmissionPolicy(namedtuple('_AdmissionPolicy', 'queue_cost, degrade_cost, reject_cost')):
+    """Cost thresholds for queueing, degrading, and rejecting requests.
+
+    A threshold of None means the action is never taken.
+    """
+
+    def decide(self, cost, can_degrade):
+        # type: (float, bool) -> str
+        """Decide what to do with a request.
+
+        Parameters:
+            cost (float): The estimated cost of the request.
+            can_degrade (bool): Whether the endpoint has a degraded mode.
+
+        Returns:
+            str: One of ACCEPT, QUEUE, DEGRADE, or REJECT.
+        """
+        if self.reject_cost is not None and cost > self.reject_cost:
+            return REJECT
+        if can_degrade and self.degrade_cost is not None and cost > self.degrade_cost:
+            return DEGRADE
+        if self.queue_cost is not None and cost > self.queue_cost:
+            return QUEUE
+        return ACCEPT
+
+
+def partition_search_cost(num_cells, num_districts):
+    # type: (int, int) -> float
+    """Estimate the cost of searching for partitions of a grid into districts.
+
+    This is the number of ways to choose the cells of one district, times
+    the number of districts.
+    """
+    num_districts = max(num_districts, 1)
+    return math.comb(num_cells, math.ceil(num_cells / num_districts)) * num_districts
+
+
+def format_cost(cost):
+    # type: (float) -> str
+    """Format a cost to three significant figures.
+
+    Costs can be exact integers too large to convert to a float, so those
+    are formatted from their logarithm.
+    """
+    try:
+        return f'{cost:.3g}'
+    except OverflowError:
+        exponent = math.floor(math.log10(cost))
+        mantissa = f'{cost / 10 ** exponent:.3g}'
+        if mantissa == '10':
+            mantissa, exponent = '1', exponent + 1
+        return f'{mantissa}e+{exponent}'
+
+
+def admit(estimate, policy, degraded=None, rejected=None):
+    """Guard a view with cost-based admission control.
+
+    Parameters:
+        estimate (Callable[[flask.Request], float]): The cost estimator. If
+            it raises an exception, the request is accepted, so that the
+            view can report the problem with the request.
+        policy (AdmissionPolicy): The thresholds.
+        degraded (Callable[..., Any]): The approximate view, if any. Without
+            one, requests that would be degraded are queued instead.
+        rejected (Callable[[str], Any]): Creates the response to a rejected
+            request from a message. By default, the message is sent with
+            status 413.
+
+    Returns:
+        Callable[[Callable[..., Any]], Callable[..., Any]]: The decorator.
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def admitted_view(*args, **kwargs):
+            try:
+                cost = estimate(request)
+            except Exception: # pylint: disable = broad-except
+                cost = 0
+            action = policy.decide(cost, degraded is not None)
+            with _lock:
+                _decisions[(request.endpoint, action)] += 1
+            if action == REJECT:
+                message = (
+                    f'This request is too large to compute (estimated cost {format_cost(cost)},'
+                    f' limit {format_cost(policy.reject_cost)}); please try a smaller one.'
+                )
+                if rejected is None:
+                    return message, 413
+                return rejected(message)
+            elif action == DEGRADE:
+                return degraded(*args, **kwargs)
+            elif action == QUEUE:
+                if not expensive_lane.acquire(timeout=QUEUE_TIMEOUT):
+                    return 'The server is busy; please try again later.', 503
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    expensive_lane.release()
+            else:
+                return view(*args, **kwargs)
+
+        return admitted_view
+
+    return decorator
+
+
+@collector
+def _admission_samples():
+    # type: () -> List[str]
+    with _lock:
+        decisions = dict(_decisions)
+    return samples(
+        'appoxy_admission_decisions_total',
+        'Admission decisions by endpoint.',
+        'counter',
+        decisions,
+        ('endpoint', 'decision'),
+    )
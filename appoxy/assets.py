@@ -0,0 +1,199 @@
+"""Precompressed, content-hashed static assets.
+
+Running this module builds gzip (and, if the brotli package is installed,
+brotli) variants of every JS and CSS file under `static/` and
+`<applet>/static/`, with the content hash in the file name. When the build
+exists, `url_for` emits the hashed names and the files are served with
+`Accept-Encoding` negotiation, an `ETag`, and an immutable `Cache-Control`.
+Without a build, static files are served as before.
+"""
+
+import gzip
+import json
+import mimetypes
+from hashlib import sha256
+from pathlib import Path
+
+from flask import current_app, request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BUILD_DIR = ROOT_DIR / 'build' / 'static'
+MANIFEST_FILE = BUILD_DIR / 'manifest.json'
+
+EXTENSIONS = ('.css', '.js')
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def source_files(root_dir=ROOT_DIR):
+    """List the static files to build.
+
+    Parameters:
+        root_dir (Path): The root of the repository.
+
+    Yields:
+        Path: The static files.
+    """
+    for pattern in ('static/*', '*/static/*'):
+        for path in sorted(root_dir.glob(pattern)):
+            if path.suffix in EXTENSIONS:
+                yield path
+
+
+def build(root_dir=ROOT_DIR, build_dir=BUILD_DIR):
+    """Write the hashed and compressed variants of every static file.
+
+    Parameters:
+        root_dir (Path): The root of the repository.
+        build_dir (Path): The directory to write to.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The manifest, keyed by source path.
+    """
+    manifest = {}
+    for path in source_files(root_dir):
+        data = path.read_bytes()
+        digest = sha256(data).hexdigest()[:16]
+        hashed = f'{path.stem}.{digest}{path.suffix}'
+        out_dir = build_dir / path.parent.relative_to(root_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        variants = {
+            'identity': data,
+            'gzip': gzip.compress(data, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            variants['br'] = brotli.compress(data)
+        encodings = {}
+        for encoding, variant in variants.items():
+            suffix = {'identity': '', 'gzip': '.gz', 'br': '.br'}[encoding]
+            (out_dir / (hashed + suffix)).write_bytes(variant)
+            encodings[encoding] = hashed + suffix
+        manifest[path.relative_to(root_dir).as_posix()] = {
+            'hashed': hashed,
+            'digest': digest,
+            'encodings': encodings,
+        }
+    build_dir.mkdir(parents=True, exist_ok=True)
+    with (build_dir / MANIFEST_FILE.name).open('w') as fd:
+        json.dump(manifest, fd, indent=4, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    """Serve the built static files, if there are any.
+
+    Files that have changed since the build are served from their source
+    instead, so a stale build never hides an edit.
+    """
+
+    def __init__(self, manifest_file=MANIFEST_FILE, root_dir=ROOT_DIR):
+        self.manifest = {}
+        self.stale = []
+        if manifest_file.exists():
+            with manifest_file.open() as fd:
+                manifest = json.load(fd)
+            for source, entry in manifest.items():
+                path = root_dir / source
+                if path.exists() and sha256(path.read_bytes()).hexdigest()[:16] == entry['digest']:
+                    self.manifest[source] = entry
+                else:
+                    self.stale.append(source)
+        self.hashed = {
+            str(Path(source).parent / entry['hashed']): source
+            for source, entry in self.manifest.items()
+        }
+
+    def init_app(self, flask_app):
+        """Serve built assets from an app.
+
+        Parameters:
+            flask_app (flask.Flask): The app.
+        """
+        if self.stale:
+            flask_app.logger.warning(
+                f'serving {len(self.stale)} changed static files unbuilt; run `python -m appoxy.assets`'
+            )
+        if not self.manifest:
+            return
+        flask_app.url_defaults(self.hash_url)
+        flask_app.before_request(self.serve)
+
+    @staticmethod
+    def static_dir(endpoint, view_args):
+        """Find the static directory an endpoint serves from.
+
+        Parameters:
+            endpoint (str): The endpoint.
+            view_args (Dict[str, Any]): The arguments to the endpoint.
+
+        Returns:
+            Optional[str]: The directory relative to the root, if any.
+        """
+        if endpoint in ('static', 'resources'):
+            return 'static'
+        elif endpoint == 'get_app_resource':
+            return f'{view_args["applet"]}/static'
+        elif endpoint and endpoint.endswith('.static'):
+            blueprint = current_app.blueprints[endpoint[:-len('.static')]]
+            return Path(blueprint.static_folder).relative_to(ROOT_DIR).as_posix()
+        else:
+            return None
+
+    def hash_url(self, endpoint, values):
+        """Replace the file name in static URLs with the hashed one."""
+        directory = self.static_dir(endpoint, values)
+        if directory is None or 'filename' not in values:
+            return
+        entry = self.manifest.get(f'{directory}/{values["filename"]}')
+        if entry is not None:
+            values['filename'] = entry['hashed']
+
+    def serve(self):
+        """Serve a built asset instead of the original file."""
+        directory = self.static_dir(request.endpoint, request.view_args)
+        if directory is None or 'filename' not in request.view_args:
+            return None
+        path = f'{directory}/{request.view_args["filename"]}'
+        if path in self.hashed:
+            source = self.hashed[path]
+            cache_control = f'public, max-age={MAX_AGE}, immutable'
+        elif path in self.manifest:
+            source = path
+            cache_control = 'no-cache'
+        else:
+            return None
+        entry = self.manifest[source]
+        encoding = 'identity'
+        for candidate in ('br', 'gzip'):
+            if candidate in entry['encodings'] and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+        response = send_file(
+            BUILD_DIR / directory / entry['encodings'][encoding],
+            mimetype=mimetypes.guess_type(source)[0],
+            etag=f'{entry["digest"]}-{encoding}',
+            conditional=True,
+        )
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+assets = Assets()
+
+
+def main():
+    # type: () -> None
+    """Build the static assets."""
+    manifest = build()
+    print(f'built {len(manifest)} assets into {BUILD_DIR}')
+
+
+if __name__ == '__main__':
+    main()
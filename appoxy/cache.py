@@ -0,0 +1,121 @@
+"""A content-addressed cache for the responses of pure POST endpoints.
+
+Responses are keyed by endpoint and a hash of the request, and evicted in
+least-recently-used order once they exceed a byte budget (set with the
+APPOXY_RESPONSE_CACHE_BYTES environment variable; 0 disables the cache).
+Clients can bypass the cache with `Cache-Control: no-cache`.
+"""
+
+import os
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from hashlib import sha256
+from threading import Lock
+
+from flask import make_response, request
+
+from .metrics import collector, samples
+
+CachedResponse = namedtuple('CachedResponse', 'body, status, content_type')
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ResponseCache:
+    """A least-recently-used cache with a byte budget."""
+
+    def __init__(self, max_bytes):
+        # type: (int) -> None
+        """Initialize the ResponseCache."""
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # type: OrderedDict[Tuple[str, str], CachedResponse]
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def __len__(self):
+        # type: () -> int
+        return len(self.entries)
+
+    def get(self, key):
+        # type: (Tuple[str, str]) -> Optional[CachedResponse]
+        """Get a cached response, if any."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        # type: (Tuple[str, str], CachedResponse) -> None
+        """Cache a response, evicting the least recently used ones."""
+        if len(entry.body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key).body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all cached responses."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache(int(os.environ.get('APPOXY_RESPONSE_CACHE_BYTES', DEFAULT_MAX_BYTES)))
+
+
+@collector
+def _cache_samples():
+    # type: () -> List[str]
+    return [
+        *samples('appoxy_response_cache_hits_total', 'Response cache hits.', 'counter', {(): response_cache.hits}),
+        *samples('appoxy_response_cache_misses_total', 'Response cache misses.', 'counter', {(): response_cache.misses}),
+        *samples('appoxy_response_cache_bytes', 'Bytes of cached responses.', 'gauge', {(): response_cache.size}),
+        *samples('appoxy_response_cache_entries', 'Number of cached responses.', 'gauge', {(): len(response_cache)}),
+    ]
+
+
+def cached(view):
+    """Cache the responses of a view that depends only on the request body.
+
+    Parameters:
+        view (Callable[..., Any]): The view function.
+
+    Returns:
+        Callable[..., flask.Response]: The caching view function.
+    """
+
+    @wraps(view)
+    def cached_view(*args, **kwargs):
+        if request.cache_control.no_cache or request.cache_control.no_store:
+            return view(*args, **kwargs)
+        digest = sha256(request.query_string + b'?' + request.get_data()).hexdigest()
+        key = (request.endpoint, digest)
+        entry = response_cache.get(key)
+        if entry is not None:
+            response = make_response(entry.body, entry.status)
+            response.content_type = entry.content_type
+            response.headers['X-Cache'] = 'hit'
+            return response
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+            response_cache.put(key, CachedResponse(
+                response.get_data(),
+                response.status_code,
+                response.content_type,
+            ))
+        response.headers['X-Cache'] = 'miss'
+        return response
+
+    return cached_view
@@ -0,0 +1,114 @@
+"""A registry of compiled pegparse grammars.
+
+Each grammar file is compiled once per thread (and again only if the file
+changes), so walkers are cheap to create for every request. Parsers keep
+their parse state on the instance, so they are not shared between threads.
+Compile and parse times are kept per grammar.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock, local
+from time import perf_counter
+
+from pegparse import create_parser_from_file, ASTWalker
+
+from .metrics import collector, record_span, samples
+
+_lock = Lock()
+_local = local()
+_stats = defaultdict(lambda: {
+    'compiles': 0,
+    'compile_seconds': 0.0,
+    'parses': 0,
+    'parse_seconds': 0.0,
+}) # type: Dict[str, Dict[str, float]]
+
+
+def get_parser(grammar_file):
+    """Get the compiled parser for a grammar file.
+
+    Parameters:
+        grammar_file (Union[str, Path]): The EBNF file.
+
+    Returns:
+        pegparse.PEGParser: The parser, which belongs to the calling thread.
+    """
+    grammar_file = str(Path(grammar_file).resolve())
+    mtime = Path(grammar_file).stat().st_mtime
+    parsers = getattr(_local, 'parsers', None) # type: Optional[Dict[str, Tuple[float, Any]]]
+    if parsers is None:
+        parsers = _local.parsers = {}
+    cached = parsers.get(grammar_file)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    start = perf_counter()
+    parser = create_parser_from_file(grammar_file)
+    record(grammar_file, 'compile', perf_counter() - start)
+    parsers[grammar_file] = (mtime, parser)
+    return parser
+
+
+def record(grammar_file, kind, seconds):
+    """Record the time taken to compile or parse with a grammar.
+
+    Parameters:
+        grammar_file (str): The EBNF file.
+        kind (str): Either "compile" or "parse".
+        seconds (float): The time taken.
+    """
+    with _lock:
+        stats = _stats[grammar_file]
+        stats[kind + 's'] += 1
+        stats[kind + '_seconds'] += seconds
+    record_span('grammar_' + kind, seconds)
+
+
+def grammar_stats():
+    """Get the compile and parse statistics of every grammar.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The statistics, keyed by grammar file.
+    """
+    with _lock:
+        return {grammar_file: dict(stats) for grammar_file, stats in _stats.items()}
+
+
+@collector
+def _grammar_samples():
+    # type: () -> List[str]
+    stats = grammar_stats()
+    lines = []
+    for key, documentation in (
+        ('compiles', 'Grammar compilations.'),
+        ('compile_seconds', 'Time spent compiling grammars.'),
+        ('parses', 'Parses with the grammar.'),
+        ('parse_seconds', 'Time spent parsing with the grammar.'),
+    ):
+        lines.extend(samples(
+            f'appoxy_grammar_{key}_total',
+            documentation,
+            'counter',
+            {(Path(grammar_file).name,): values[key] for grammar_file, values in stats.items()},
+            ('grammar',),
+        ))
+    return lines
+
+
+class GrammarWalker(ASTWalker): # type: ignore
+    """An ASTWalker whose grammar comes from the registry."""
+
+    def __init__(self, grammar_file, root_term):
+        # type: (Union[str, Path], str) -> None
+        """Initialize the GrammarWalker."""
+        self.grammar_file = str(Path(grammar_file).resolve())
+        super().__init__(get_parser(self.grammar_file), root_term)
+
+    def parse(self, text, term=None):
+        # type: (str, Optional[str]) -> Any
+        """Parse the text and time it."""
+        start = perf_counter()
+        try:
+            return super().parse(text, term)
+        finally:
+            record(self.grammar_file, 'parse', perf_counter() - start)
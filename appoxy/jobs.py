@@ -0,0 +1,254 @@
+"""Asynchronous solver jobs with progress, backed by SQLite.
+
+Submitting a job returns an id immediately. The job runs in the solver
+pool; its progress counters and eventual result are written to a SQLite
+database (APPOXY_JOB_DB, by default in the temporary directory), so any
+web worker can report on it, and clients can poll or reconnect at will.
+"""
+
+import json
+import os
+import sqlite3
+from collections import Counter
+from tempfile import gettempdir
+from threading import Thread
+from time import sleep, time
+from uuid import uuid4
+
+from flask import Response, abort, jsonify, request
+
+from .admission import admit
+from .pool import solver_pool
+
+DB_FILE = os.environ.get('APPOXY_JOB_DB', os.path.join(gettempdir(), 'appoxy-jobs.sqlite3'))
+JOB_TIMEOUT = float(os.environ.get('APPOXY_JOB_TIMEOUT', 600))
+JOB_LIFETIME = 24 * 60 * 60
+PROGRESS_INTERVAL = 0.25
+POLL_INTERVAL = 0.5
+
+
+class JobStore:
+    """A SQLite table of jobs."""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        """Initialize the JobStore."""
+        self.path = path
+        with self.connect() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            ''')
+
+    def connect(self):
+        # type: () -> sqlite3.Connection
+        """Open a connection to the database."""
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def create(self, kind):
+        # type: (str) -> str
+        """Create a queued job and return its id."""
+        job_id = uuid4().hex
+        now = time()
+        with self.connect() as connection:
+            connection.execute('DELETE FROM jobs WHERE updated < ?', (now - JOB_LIFETIME,))
+            connection.execute(
+                'INSERT INTO jobs VALUES (?, ?, ?, ?, NULL, NULL, ?, ?)',
+                (job_id, kind, 'queued', '{}', now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **columns):
+        # type: (str, **Any) -> None
+        """Update columns of a job."""
+        columns['updated'] = time()
+        assignments = ', '.join(f'{column} = ?' for column in columns)
+        with self.connect() as connection:
+            connection.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?',
+                (*columns.values(), job_id),
+            )
+
+    def get(self, job_id):
+        # type: (str) -> Optional[Dict[str, Any]]
+        """Get a job, if it exists."""
+        with self.connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['progress'] = json.loads(job['progress'])
+        return job
+
+
+class JobProgress(Counter):
+    """Progress counters that are periodically written to the job store."""
+
+    def __init__(self, store, job_id):
+        # type: (JobStore, str) -> None
+        """Initialize the JobProgress."""
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self.last_flush = 0.0
+
+    def __setitem__(self, key, value):
+        # type: (str, int) -> None
+        super().__setitem__(key, value)
+        if time() - self.last_flush > PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        # type: () -> None
+        """Write the counters to the job store."""
+        self.last_flush = time()
+        self.store.update(self.job_id, progress=json.dumps(self))
+
+
+job_store = JobStore(DB_FILE)
+
+
+def _run_in_worker(job_id, function, args):
+    # type: (str, Callable[..., Any], Tuple[Any, ...]) -> Any
+    progress = JobProgress(job_store, job_id)
+    job_store.update(job_id, status='running')
+    result = function(*args, progress=progress)
+    progress.flush()
+    return result
+
+
+def _run_job(job_id, function, args):
+    # type: (str, Callable[..., Any], Tuple[Any, ...]) -> None
+    try:
+        result = solver_pool.run(_run_in_worker, job_id, function, args, timeout=JOB_TIMEOUT)
+    except Exception as err: # pylint: disable = broad-except
+        job_store.update(job_id, status='failed', error=str(err) or type(err).__name__)
+    else:
+        job_store.update(job_id, status='done', result=json.dumps(result))
+
+
+def submit(kind, function, *args):
+    """Start a job in the background.
+
+    Parameters:
+        kind (str): The kind of job.
+        function (Callable[..., Any]): The function to run. It must accept a
+            `progress` keyword argument and return a JSON-able value.
+        *args (Any): The arguments to the function.
+
+    Returns:
+        str: The id of the job.
+    """
+    job_id = job_store.create(kind)
+    Thread(target=_run_job, args=(job_id, function, args), daemon=True).start()
+    return job_id
+
+
+def _job_status(job):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    return {key: job[key] for key in ('id', 'kind', 'status', 'progress', 'error', 'created', 'updated')}
+
+
+def _event(event, data):
+    # type: (str, str) -> str
+    return f'event: {event}\ndata: {data}\n\n'
+
+
+def _check_abandoned(job):
+    # type: (Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]
+    # the worker that owns a job marks it failed when it times out, unless
+    # the worker itself has died
+    if job is not None and job['status'] in ('queued', 'running') and time() > job['created'] + JOB_TIMEOUT:
+        job_store.update(job['id'], status='failed', error='The job did not finish in time.')
+        job = job_store.get(job['id'])
+    return job
+
+
+def _stream_job(job_id):
+    # type: (str) -> Generator[str, None, None]
+    last_status = None
+    while True:
+        job = _check_abandoned(job_store.get(job_id))
+        if job is None:
+            yield _event('error', json.dumps({'error': 'The job has expired.'}))
+            return
+        status = _job_status(job)
+        if status != last_status:
+            yield _event('status', json.dumps(status))
+            last_status = status
+        if job['status'] == 'done':
+            yield _event('result', job['result'])
+            return
+        elif job['status'] == 'failed':
+            return
+        sleep(POLL_INTERVAL)
+
+
+def add_job_routes(blueprint, function, estimate=None, policy=None):
+    """Add routes to submit and follow jobs that run a function.
+
+    The routes are:
+
+    * POST jobs: start a job with the JSON request body as its argument.
+    * GET jobs/<job_id>: the status and progress of the job.
+    * GET jobs/<job_id>/result: the result of the job, its status if it is
+      not done, or its status and error (with status 500) if it failed. With `Accept: text/event-stream`, status updates and the
+      result are streamed as Server-Sent Events instead.
+
+    Parameters:
+        blueprint (flask.Blueprint): The blueprint of the applet.
+        function (Callable[..., Any]): The function to run for each job.
+        estimate (Callable[[flask.Request], float]): The cost estimator of
+            the applet, if submissions are subject to admission control.
+        policy (AdmissionPolicy): The admission thresholds of the applet.
+    """
+
+    def get_job(job_id):
+        job = _check_abandoned(job_store.get(job_id))
+        if job is None or job['kind'] != blueprint.name:
+            abort(404)
+        return job
+
+    def submit_job():
+        try:
+            data = json.loads(request.get_data())
+        except ValueError:
+            return jsonify({'error': 'The job must be JSON.'}), 400
+        job_id = submit(blueprint.name, function, data)
+        return jsonify({'id': job_id, 'status': 'queued'}), 202
+
+    if estimate is not None:
+        # jobs hold a solver worker as long as a synchronous solve would
+        submit_job = admit(estimate, policy)(submit_job)
+
+    def job_status(job_id):
+        return jsonify(_job_status(get_job(job_id)))
+
+    def job_result(job_id):
+        job = get_job(job_id)
+        if request.accept_mimetypes.best == 'text/event-stream':
+            return Response(
+                _stream_job(job_id),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+            )
+        elif job['status'] == 'done':
+            return Response(job['result'], mimetype='application/json')
+        elif job['status'] == 'failed':
+            return jsonify(_job_status(job)), 500
+        else:
+            return jsonify(_job_status(job)), 202
+
+    blueprint.add_url_rule('/jobs', 'submit_job', submit_job, methods=['POST'])
+    blueprint.add_url_rule('/jobs/<job_id>', 'job_status', job_status)
+    blueprint.add_url_rule('/jobs/<job_id>/result', 'job_result', job_result)
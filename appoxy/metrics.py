@@ -0,0 +1,200 @@
+"""Request and hot-path metrics in the Prometheus text format.
+
+Metrics are kept per process; under gunicorn, each worker reports its own.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+from flask import g, request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = tuple(4 ** exponent for exponent in range(3, 12))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(label_names, label_values):
+    # type: (Sequence[str], Sequence[Any]) -> str
+    """Format labels as a Prometheus label set."""
+    if not label_names:
+        return ''
+    labels = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in zip(label_names, label_values)
+    )
+    return '{' + labels + '}'
+
+
+class Histogram:
+    """A Prometheus histogram with labels."""
+
+    def __init__(self, name, documentation, buckets, label_names=()):
+        # type: (str, str, Sequence[float], Sequence[str]) -> None
+        """Initialize the Histogram."""
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self.series = OrderedDict() # type: Dict[Tuple[str, ...], List[Any]]
+        self.lock = Lock()
+
+    def observe(self, value, *label_values):
+        # type: (float, *Any) -> None
+        """Record an observation."""
+        with self.lock:
+            if label_values not in self.series:
+                self.series[label_values] = [[0] * len(self.buckets), 0, 0]
+            counts, _, _ = series = self.series[label_values]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def exposition(self):
+        # type: () -> List[str]
+        """Serialize the histogram to the Prometheus text format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        bucket_names = (*self.label_names, 'le')
+        with self.lock:
+            for label_values, (counts, total, count) in self.series.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = format_labels(bucket_names, (*label_values, bound))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = format_labels(bucket_names, (*label_values, '+Inf'))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                labels = format_labels(self.label_names, label_values)
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'appoxy_request_seconds',
+    'Request latency by endpoint.',
+    LATENCY_BUCKETS,
+    ('endpoint', 'method', 'status'),
+)
+REQUEST_BYTES = Histogram(
+    'appoxy_request_bytes',
+    'Request body size by endpoint.',
+    SIZE_BUCKETS,
+    ('endpoint',),
+)
+RESPONSE_BYTES = Histogram(
+    'appoxy_response_bytes',
+    'Response body size by endpoint.',
+    SIZE_BUCKETS,
+    ('endpoint',),
+)
+SPAN_SECONDS = Histogram(
+    'appoxy_span_seconds',
+    'Time spent in named internal spans.',
+    LATENCY_BUCKETS,
+    ('span',),
+)
+
+histograms = [REQUEST_SECONDS, REQUEST_BYTES, RESPONSE_BYTES, SPAN_SECONDS]
+collectors = [] # type: List[Callable[[], List[str]]]
+
+
+def collector(function):
+    """Register a function that returns extra exposition lines.
+
+    Parameters:
+        function (Callable[[], List[str]]): The function.
+
+    Returns:
+        Callable[[], List[str]]: The same function.
+    """
+    collectors.append(function)
+    return function
+
+
+def samples(name, documentation, metric_type, values, label_names=()):
+    """Serialize simple counters or gauges to the Prometheus text format.
+
+    Parameters:
+        name (str): The name of the metric.
+        documentation (str): The help text of the metric.
+        metric_type (str): Either "counter" or "gauge".
+        values (Mapping[Tuple[Any, ...], float]): The values, keyed by labels.
+        label_names (Sequence[str]): The names of the labels.
+
+    Returns:
+        List[str]: The exposition lines.
+    """
+    lines = [
+        f'# HELP {name} {documentation}',
+        f'# TYPE {name} {metric_type}',
+    ]
+    for label_values, value in values.items():
+        lines.append(f'{name}{format_labels(label_names, label_values)} {value}')
+    return lines
+
+
+def record_span(name, seconds):
+    # type: (str, float) -> None
+    """Record the time spent in a named span."""
+    SPAN_SECONDS.observe(seconds, name)
+
+
+@contextmanager
+def span(name):
+    """Time a named span of code.
+
+    Parameters:
+        name (str): The name of the span.
+
+    Yields:
+        None
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, perf_counter() - start)
+
+
+def exposition():
+    # type: () -> str
+    """Serialize all metrics to the Prometheus text format."""
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.exposition())
+    for function in collectors:
+        lines.extend(function())
+    return '\n'.join(lines) + '\n'
+
+
+def _start_timer():
+    # type: () -> None
+    g.metrics_start = perf_counter()
+
+
+def _record_request(response):
+    # type: (flask.Response) -> flask.Response
+    endpoint = request.endpoint or 'unmatched'
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        REQUEST_SECONDS.observe(perf_counter() - start, endpoint, request.method, response.status_code)
+    REQUEST_BYTES.observe(request.content_length or 0, endpoint)
+    if response.content_length is not None:
+        RESPONSE_BYTES.observe(response.content_length, endpoint)
+    return response
+
+
+def init_app(flask_app):
+    """Record request metrics for an app.
+
+    Parameters:
+        flask_app (flask.Flask): The app.
+    """
+    flask_app.before_request(_start_timer)
+    flask_app.after_request(_record_request)
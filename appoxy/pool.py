@@ -0,0 +1,164 @@
+"""A bounded pool of processes for CPU-bound solver requests.
+
+Jobs run in persistent worker processes, so that a long solve neither
+blocks the web server nor holds the GIL, and so that a worker keeps its
+imports and compiled grammars from one job to the next. Workers are started
+by a fork server rather than forked from the (multi-threaded) web server,
+so they cannot inherit locks held by other threads. A job that runs past
+its timeout is killed along with its worker, which is replaced on demand.
+At most `max_workers` jobs run at once, and at most `max_queue` more may
+wait for a free worker.
+"""
+
+import multiprocessing
+import os
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+from .metrics import collector, samples
+
+
+class PoolBusy(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+class JobTimeout(Exception):
+    """Raised when a job does not finish in time."""
+
+
+def _serve(connection):
+    # type: (multiprocessing.connection.Connection) -> None
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            result = (True, function(*args))
+        except Exception as err: # pylint: disable = broad-except
+            result = (False, err)
+        try:
+            connection.send(result)
+        except Exception: # pylint: disable = broad-except
+            connection.send((False, RuntimeError(repr(result[1]))))
+
+
+class Worker:
+    """A persistent worker process."""
+
+    def __init__(self, context):
+        # type: (multiprocessing.context.BaseContext) -> None
+        """Initialize the Worker."""
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self):
+        # type: () -> None
+        """Kill the worker process."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class SolverPool:
+    """A bounded pool of worker processes."""
+
+    def __init__(self, max_workers, max_queue, timeout):
+        # type: (int, int, float) -> None
+        """Initialize the SolverPool.
+
+        Parameters:
+            max_workers (int): The maximum number of concurrent jobs.
+            max_queue (int): The maximum number of jobs waiting for a worker.
+            timeout (float): The default seconds to wait for a job, including
+                time spent waiting for a worker.
+        """
+        self.context = multiprocessing.get_context('forkserver')
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.slots = BoundedSemaphore(max_workers)
+        self.lock = Lock()
+        self.idle = [] # type: List[Worker]
+        self.waiting = 0
+        self.running = 0
+
+    def run(self, function, *args, timeout=None):
+        """Run a function in a worker process and wait for its result.
+
+        Parameters:
+            function (Callable[..., Any]): The function to run, which must be
+                importable by the worker, as must its arguments.
+            *args (Any): The arguments to the function.
+            timeout (float): The seconds to wait, if not the default.
+
+        Returns:
+            Any: The return value of the function.
+
+        Raises:
+            PoolBusy: If the queue is full.
+            JobTimeout: If the job did not finish in time. The job is killed.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = monotonic() + timeout
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                if self.waiting >= self.max_queue:
+                    raise PoolBusy(f'{self.waiting} jobs are already waiting')
+                self.waiting += 1
+            try:
+                acquired = self.slots.acquire(timeout=timeout)
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+            if not acquired:
+                raise JobTimeout(f'no worker became free within {timeout} seconds')
+        with self.lock:
+            self.running += 1
+            worker = self.idle.pop() if self.idle else None
+        healthy = False
+        try:
+            if worker is not None and not worker.process.is_alive():
+                worker.stop()
+                worker = None
+            if worker is None:
+                worker = Worker(self.context)
+            worker.connection.send((function, args))
+            if not worker.connection.poll(max(deadline - monotonic(), 0)):
+                raise JobTimeout(f'the job did not finish within {timeout} seconds')
+            try:
+                succeeded, result = worker.connection.recv()
+                healthy = True
+            except EOFError:
+                succeeded, result = False, RuntimeError('the job exited without a result')
+        finally:
+            with self.lock:
+                self.running -= 1
+                if healthy:
+                    self.idle.append(worker)
+            if not healthy and worker is not None:
+                worker.stop()
+            self.slots.release()
+        if not succeeded:
+            raise result
+        return result
+
+
+solver_pool = SolverPool(
+    max_workers=int(os.environ.get('APPOXY_SOLVER_WORKERS', os.cpu_count() or 1)),
+    max_queue=int(os.environ.get('APPOXY_SOLVER_QUEUE', 2 * (os.cpu_count() or 1))),
+    timeout=float(os.environ.get('APPOXY_SOLVER_TIMEOUT', 25)),
+)
+
+
+@collector
+def _pool_samples():
+    # type: () -> List[str]
+    return [
+        *samples('appoxy_solver_jobs_running', 'Solver jobs running.', 'gauge', {(): solver_pool.running}),
+        *samples('appoxy_solver_jobs_waiting', 'Solver jobs waiting for a worker.', 'gauge', {(): solver_pool.waiting}),
+    ]
@@ -0,0 +1,54 @@
+"""Record POST requests to a JSONL file for later replay.
+
+Recording is off unless the APPOXY_RECORD_FILE environment variable names
+the file to append to. Only the method, path, content type, and body of
+each request are kept; headers, cookies, and client addresses are not.
+Bodies larger than APPOXY_RECORD_MAX_BYTES (default 1 MiB) are skipped.
+"""
+
+import json
+import os
+from threading import Lock
+from time import time
+
+from flask import request
+
+RECORD_FILE = os.environ.get('APPOXY_RECORD_FILE')
+MAX_BYTES = int(os.environ.get('APPOXY_RECORD_MAX_BYTES', 1024 * 1024))
+
+_lock = Lock()
+
+
+def sanitize(body):
+    # type: (bytes) -> str
+    """Convert a request body to text that is safe to store."""
+    return body.decode('utf-8', errors='replace').replace('\x00', '')
+
+
+def _record_request():
+    # type: () -> None
+    if request.method != 'POST' or request.endpoint is None:
+        return
+    body = request.get_data()
+    if len(body) > MAX_BYTES:
+        return
+    line = json.dumps({
+        'time': time(),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'content_type': request.content_type,
+        'body': sanitize(body),
+    })
+    with _lock, open(RECORD_FILE, 'a') as fd:
+        fd.write(line + '\n')
+
+
+def init_app(flask_app):
+    """Record the POST requests to an app, if recording is on.
+
+    Parameters:
+        flask_app (flask.Flask): The app.
+    """
+    if RECORD_FILE:
+        flask_app.before_request(_record_request)
@@ -1,8 +1,14 @@
+import json
+import os
 from os.path import basename, dirname, join as join_path
 
-from flask import Blueprint, render_template, request
+from flask import Blueprint, jsonify, render_template, request
 
-from .bayesnet import BayesNet
+from appoxy.admission import AdmissionPolicy, admit
+from appoxy.cache import cached
+from appoxy.metrics import collector, samples, span
+
+from .bayesnet import BayesNet, NetworkCache, estimate_inference_cost, estimate_junction_tree_cost
 
 APP_NAME = basename(dirname(__file__))
 
@@ -16,16 +22,138 @@ app = Blueprint(
 )
 
 
+# networks too large for exact inference are sampled instead
+ADMISSION_POLICY = AdmissionPolicy(queue_cost=1e5, degrade_cost=1e6, reject_cost=None)
+DEGRADED_TIME_LIMIT = 1.0
+QUERY_ADMISSION_POLICY = AdmissionPolicy(queue_cost=1e5, degrade_cost=None, reject_cost=1e8)
+
+# parsed networks, reused when only the observations change
+network_cache = NetworkCache(int(os.environ.get('APPOXY_NETWORK_CACHE_SIZE', 64)))
+
+
+@collector
+def _network_cache_samples():
+    # type: () -> List[str]
+    return [
+        *samples('appoxy_bayes_network_cache_hits_total', 'Parsed network cache hits.', 'counter', {(): network_cache.hits}),
+        *samples('appoxy_bayes_network_cache_misses_total', 'Parsed network cache misses.', 'counter', {(): network_cache.misses}),
+        *samples('appoxy_bayes_network_cache_entries', 'Number of cached parsed networks.', 'gauge', {(): len(network_cache)}),
+    ]
+
+
 @app.route('/')
 def root():
     return render_template(join_path(APP_NAME, 'index.html'))
 
 
-@app.route('/parse', methods=['POST'])
-def parse():
+def estimate_cost(flask_request):
+    return estimate_inference_cost(flask_request.get_data(as_text=True))
+
+
+def render(**options):
     bayes_text = request.get_data(as_text=True)
-    net = BayesNet(bayes_text)
+    with span('inference'):
+        net = BayesNet(bayes_text, cache=network_cache, **options)
     if net.has_errors:
-        return net.error
+        result = net.error
     else:
-        return net.dot()
+        with span('dot'):
+            result = net.dot()
+    # `?stats` wraps the graph with what inference cost, to diagnose slow networks
+    if 'stats' not in request.args:
+        return result
+    return jsonify({
+        'dot': None if net.has_errors else result,
+        'error': net.error,
+        'stats': net.stats_summary(),
+    })
+
+
+def approximate():
+    return render(method='likelihood_weighting', seed=0, time_limit=DEGRADED_TIME_LIMIT)
+
+
+@app.route('/parse', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY, degraded=approximate)
+def parse():
+    options = {'precision': request.args.get('precision')}
+    if 'method' in request.args:
+        options['method'] = request.args['method']
+    if 'seed' in request.args:
+        options['seed'] = request.args.get('seed', type=int)
+        if options['seed'] is None:
+            return 'Error: "seed" must be an integer.', 400
+    return render(**options)
+
+
+def estimate_query_cost(flask_request):
+    data = json.loads(flask_request.get_data())
+    return estimate_junction_tree_cost(data['network']) * max(len(data.get('scenarios', [])), 1)
+
+
+def query_error(data):
+    """Check the fields of a query.
+
+    Arguments:
+        data (Any): The decoded JSON body of the query.
+
+    Returns:
+        Optional[str]: A description of the first invalid field, if any.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('network'), str):
+        return 'Error: The query must be an object with a "network" string.'
+    for option in ('method', 'precision'):
+        if data.get(option) is not None and not isinstance(data[option], str):
+            return 'Error: "{}" must be a string.'.format(option)
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        return 'Error: "seed" must be an integer.'
+    scenarios = data.get('scenarios', [{}])
+    if not isinstance(scenarios, list) or not all(
+            isinstance(scenario, dict) and all(isinstance(value, str) for value in scenario.values())
+            for scenario in scenarios):
+        return 'Error: "scenarios" must be a list of objects from node names to values.'
+    targets = data.get('targets')
+    if targets is not None and (not isinstance(targets, list) or not all(isinstance(target, str) for target in targets)):
+        return 'Error: "targets" must be a list of node names.'
+    return None
+
+
+@app.route('/query', methods=['POST'])
+@cached
+@admit(estimate_query_cost, QUERY_ADMISSION_POLICY, rejected=(lambda message: (jsonify({'error': message}), 413)))
+def query():
+    try:
+        data = json.loads(request.get_data())
+    except ValueError:
+        return jsonify({'error': 'Error: The query must be JSON.'}), 400
+    error = query_error(data)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    options = {'precision': data.get('precision')}
+    for option in ('method', 'seed'):
+        if option in data:
+            options[option] = data[option]
+    with span('inference'):
+        net = BayesNet(data['network'], cache=network_cache, **options)
+        if net.has_errors:
+            return jsonify({'error': net.error}), 400
+        targets = data.get('targets')
+        if targets is not None:
+            unknown = [target for target in targets if target not in net.nodes]
+            if unknown:
+                return jsonify({'error': 'Error: There is no "{}" to be predicted.'.format(unknown[0])}), 400
+        scenarios = net.query_batch(data.get('scenarios', [{}]), targets)
+    with span('json_encoding'):
+        return jsonify({'results': [
+            {
+                'posteriors': {
+                    name: {value: float(prob) for value, prob in posterior.items()}
+                    for name, posterior in scenario.posteriors.items()
+                },
+                'errors': scenario.posterior_errors,
+                'error': scenario.error,
+            }
+            for scenario in scenarios
+        ]})
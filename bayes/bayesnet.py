@@ -1,5 +1,19 @@
+from bisect import bisect
+from collections import OrderedDict, deque, namedtuple
+from hashlib import sha256
 from itertools import chain, product
 from fractions import Fraction
+from threading import Lock
+from time import perf_counter
+
+from .inference import PRECISIONS, InferenceStats, JunctionTree, np, relevant_nodes, strides, variable_elimination
+from .inference import eliminate, elimination_order, interaction_graph
+from .sampling import SAMPLERS
+
+EXACT_METHODS = ("junction_tree", "elimination", "enumeration")
+IMPOSSIBLE_EVIDENCE = "The observations are statistically impossible (have posterior probability of 0%)"
+
+Scenario = namedtuple("Scenario", "posteriors, posterior_errors, error")
 
 
 def my_product(l):
@@ -9,6 +23,57 @@ def my_product(l):
     return result
 
 
+def estimate_inference_cost(text):
+    """Estimate the cost of parsing a network and inferring any posteriors.
+
+    Arguments:
+        text (str): The Bayes network.
+
+    Returns:
+        int: The estimated cost.
+    """
+    lines = tuple(line.strip().lower() for line in text.splitlines())
+    if not any(line.startswith("observe ") or line == "predict" for line in lines):
+        return len(lines)
+    return estimate_junction_tree_cost(text)
+
+
+def estimate_junction_tree_cost(text):
+    """Estimate the number of table entries needed to infer all posteriors.
+
+    This only scans the text for edges and CPT headers, and adds up the sizes
+    of the cliques that a junction tree of the network would have.
+
+    Arguments:
+        text (str): The Bayes network.
+
+    Returns:
+        int: The estimated cost.
+    """
+    lines = tuple(line.strip().lower() for line in text.splitlines())
+    parents = {}
+    for line in lines:
+        if "->" in line:
+            parent_name, child_name = (node.strip() for node in line.split("->", maxsplit=1))
+            parents.setdefault(parent_name, set())
+            parents.setdefault(child_name, set()).add(parent_name)
+    num_values = {}
+    for line_num, line in enumerate(lines[:-1]):
+        if line.strip(":").startswith("cpt for "):
+            node_name = line.strip(":")[len("cpt for "):].strip()
+            num_values[node_name] = max(len(lines[line_num + 1].split()) - len(parents.get(node_name, ())), 2)
+    nodes = dict((node_name, Node(node_name)) for node_name in parents)
+    for node_name, node in nodes.items():
+        node.parents = [nodes[parent_name] for parent_name in sorted(parents[node_name])]
+        node.values = num_values.get(node_name, 2) * [None]
+    scopes = [(*node.parents, node) for node in nodes.values()]
+    neighbors = interaction_graph(scopes)
+    return sum(
+        my_product(len(other.values) for other in eliminate(neighbors, node) | set([node]))
+        for node in elimination_order(scopes, nodes.values())
+    )
+
+
 class Node:
 
     def __init__(self, name):
@@ -18,25 +83,39 @@ class Node:
         self.depth = 0
         self.values = []
         self.cpt = []
-        self.observation = None
-        self.posterior = {}
-        self.reset()
+        # the compiled CPT, indexed by the value codes of the parents and then the node
+        self.codes = {}
+        self.strides = ()
+        self.table = []
+        self._ancestors = None
 
-    def reset(self):
-        self.observation = None
-        self.posterior = {}
+    def compile_cpt(self):
+        self.codes = dict((value, code) for code, value in enumerate(self.values))
+        self.strides = strides((*self.parents, self))
+        self.table = len(self.values) * my_product(len(parent.values) for parent in self.parents) * [0]
+        for key, probs in self.cpt:
+            key = dict(key)
+            offset = sum(
+                stride * parent.codes[key[parent.name]]
+                for parent, stride in zip(self.parents, self.strides)
+            )
+            for value, prob in probs:
+                self.table[offset + self.codes[value]] = prob
 
-    def observe(self, value):
-        for v in self.values:
-            self.posterior[v] = 0
-        self.observation = value
-        self.posterior[value] = 1
+    def ancestors(self):
+        if self._ancestors is None:
+            ancestors = set()
+            stack = list(self.parents)
+            while stack:
+                node = stack.pop()
+                if node not in ancestors:
+                    ancestors.add(node)
+                    stack.extend(node.parents)
+            self._ancestors = frozenset(ancestors)
+        return self._ancestors
 
     def is_ancestor(self, node):
-        if self == node:
-            return True
-        else:
-            return any(parent.is_ancestor(node) for parent in self.parents)
+        return self == node or node in self.ancestors()
 
     def cpt_string(self):
         result = []
@@ -93,10 +172,16 @@ class Node:
             ]))
         return "\n".join(result)
 
-    def posterior_string(self):
+    def posterior_string(self, posterior, posterior_error=None):
         result = []
         values_header = tuple("P({})".format(value) for value in self.values)
-        probs = tuple("{:.2f}%".format(float(100 * self.posterior[value])) for value in self.values)
+        if posterior_error:
+            probs = tuple(
+                "{:.2f}±{:.2f}%".format(float(100 * posterior[value]), 100 * posterior_error[value])
+                for value in self.values
+            )
+        else:
+            probs = tuple("{:.2f}%".format(float(100 * posterior[value])) for value in self.values)
         prob_widths = tuple(max(len(row[col]) for row in (values_header, probs)) for col in range(len(self.values)))
         result.append(self.name)
         result.append("".join([
@@ -119,49 +204,221 @@ class Node:
         return "\n".join(result)
 
 
+def is_structural(line):
+    """Check if a line could affect the edges or CPTs of a network.
+
+    Arguments:
+        line (str): A stripped, lower-case line of the network.
+
+    Returns:
+        bool: False for blank, observe, predict, and precision lines.
+    """
+    if "->" in line:
+        return True
+    words = line.split()
+    return not (
+        not words or words[0] == "observe" or line == "predict" or (len(words) == 2 and words[0] == "precision")
+    )
+
+
+def structure_key(lines):
+    """Hash the edges and CPTs of a network, ignoring its evidence.
+
+    Arguments:
+        lines (Sequence[str]): The stripped, lower-case lines of the network.
+
+    Returns:
+        str: The hash.
+    """
+    return sha256("\n".join(line for line in lines if is_structural(line)).encode("utf-8")).hexdigest()
+
+
+class CompiledNetwork:
+    """The parsed nodes of a network, which do not change with evidence."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.junction_trees = {}
+        self.lock = Lock()
+
+    def junction_tree(self, ordering):
+        with self.lock:
+            if ordering not in self.junction_trees:
+                self.junction_trees[ordering] = JunctionTree(self.nodes.values(), ordering)
+            return self.junction_trees[ordering]
+
+
+class NetworkCache:
+    """A least-recently-used cache of compiled networks, keyed by structure."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        with self.lock:
+            compiled = self.entries.get(key)
+            if compiled is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return compiled
+
+    def put(self, key, compiled):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = compiled
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
 class BayesNet:
 
-    def __init__(self, text):
+    def __init__(
+            self, text, method="junction_tree", ordering="min_fill", precision=None,
+            seed=None, num_samples=10000, time_limit=None, cache=None):
+        """Parse a Bayes network and infer any requested posteriors.
+
+        Arguments:
+            text (str): The Bayes network.
+            method (str): The inference algorithm: "junction_tree", which
+                computes all posteriors together, "elimination", which
+                computes each posterior separately, "enumeration", which is
+                always exact, or the approximate "likelihood_weighting" and
+                "gibbs", which also give the standard error of posteriors.
+            ordering (str): The elimination ordering heuristic, either
+                "min_fill" or "min_degree".
+            precision (str): The arithmetic used for elimination and junction
+                trees: "exact"
+                (Fractions), "float" (float64), or "log" (float64 log
+                probabilities, for deep networks). Defaults to a "precision"
+                line in the text, or "exact" if there is none.
+            seed (int): The random seed for sampling.
+            num_samples (int): The maximum number of samples.
+            time_limit (float): The maximum number of seconds to sample for.
+            cache (NetworkCache): A cache of parsed networks to reuse, if the
+                text only differs from one in its observations.
+        """
         self.text = tuple(line.strip().lower() for line in text.splitlines())
         self.nodes = {}
         self.error = None
+        self.method = method
+        self.ordering = ordering
+        self.precision = precision
+        self.seed = seed
+        self.num_samples = num_samples
+        self.time_limit = time_limit
+        self.cache = cache
+        self.compiled = None
+        # the results of inference, by node name
+        self.observations = {}
+        self.posteriors = {}
+        self.posterior_errors = {}
+        # the work done by the latest inference, and the seconds of each stage
+        self.stats = InferenceStats()
+        self.timings = {}
+        start = perf_counter()
         try:
             self._parse()
         except SyntaxError:
             return
+        finally:
+            self.timings["parse"] = perf_counter() - start - self.timings.get("inference", 0)
 
     def _error(self, message):
         self.error = "Error: " + message
         raise SyntaxError(message)
 
     def _parse(self):
-        # parse all edges first
-        for line in self.text:
+        # index the edges, CPTs, and observations in one pass
+        edge_lines = []
+        observe_lines = []
+        self.cpt_lines = {}
+        text_precision = None
+        predict = False
+        for line_num, line in enumerate(self.text):
+            words = line.split()
             if "->" in line:
+                edge_lines.append(line)
+            if line.strip(":").startswith("cpt for "):
+                self.cpt_lines.setdefault(line.strip(":")[len("cpt for "):], []).append(line_num)
+            if line.startswith("observe ") and len(words) == 4:
+                observe_lines.append(words)
+            if len(words) == 2 and words[0] == "precision":
+                text_precision = words[1]
+            if line == "predict":
+                predict = True
+        self._parse_options(text_precision)
+        key = None
+        if self.cache is not None:
+            key = structure_key(self.text)
+            self.compiled = self.cache.get(key)
+        if self.compiled is not None and not self._fits(self.compiled):
+            self.compiled = None
+        if self.compiled is not None:
+            self.nodes = self.compiled.nodes
+        else:
+            # parse all edges first
+            for line in edge_lines:
                 self._parse_edge(line)
-        # order nodes by depth
-        self._check_dag()
-        # find CPTs for nodes
-        for node in sorted(self.nodes.values(), key=(lambda n: (n.depth, n.name))):
-            self._parse_CPT(node.name)
+            # order nodes by depth
+            self._check_dag()
+            # find CPTs for nodes
+            for node in sorted(self.nodes.values(), key=(lambda n: (n.depth, n.name))):
+                self._parse_CPT(node.name)
+            self.compiled = CompiledNetwork(self.nodes)
+            if self.cache is not None:
+                self.cache.put(key, self.compiled)
         observations = {}
         # find all observed nodes
-        predict = False
-        for line in self.text:
-            if line.startswith("observe "):
-                words = line.split()
-                if len(words) == 4:
-                    if words[1] not in self.nodes:
-                        self._error("There is no \"{}\" to be observed.".format(words[1]))
-                    if words[3] not in self.nodes[words[1]].values:
-                        self._error("\"{}\" is not a valid observation of \"{}\".".format(words[3], words[1]))
-                    observations[words[1]] = words[3]
-                    predict = True
-        if "predict" in self.text:
+        for words in observe_lines:
+            if words[1] not in self.nodes:
+                self._error("There is no \"{}\" to be observed.".format(words[1]))
+            if words[3] not in self.nodes[words[1]].values:
+                self._error("\"{}\" is not a valid observation of \"{}\".".format(words[3], words[1]))
+            observations[words[1]] = words[3]
             predict = True
         if predict:
             self.infer(observations)
 
+    def _fits(self, compiled):
+        # the lines left out of the structure key must not be inside a CPT,
+        # where they would be parsed as rows
+        ignored = [line_num for line_num, line in enumerate(self.text) if not is_structural(line)]
+        for node in compiled.nodes.values():
+            if len(self.cpt_lines.get(node.name, ())) != 1:
+                return False
+            start = self.cpt_lines[node.name][0]
+            end = start + 1 + len(node.cpt)
+            if any(start < line_num <= end for line_num in ignored[bisect(ignored, start):bisect(ignored, end)]):
+                return False
+        return True
+
+    def _parse_options(self, text_precision):
+        if self.method not in EXACT_METHODS and self.method not in SAMPLERS:
+            self._error("\"{}\" is not a valid inference method (use {}).".format(
+                self.method, ", ".join(EXACT_METHODS + tuple(SAMPLERS))
+            ))
+        if self.method in SAMPLERS and np is None:
+            self._error("Sampling requires NumPy, which is not installed.")
+        if self.precision is None:
+            self.precision = text_precision or "exact"
+        if self.precision not in PRECISIONS:
+            self._error("\"{}\" is not a valid precision (use {}).".format(
+                self.precision, ", ".join(sorted(PRECISIONS))
+            ))
+        if self.precision != "exact" and np is None:
+            self._error("{} precision requires NumPy, which is not installed.".format(self.precision))
+
     def _parse_edge(self, line):
         nodes = tuple(node.strip() for node in line.split("->"))
         if len(nodes) > 2:
@@ -178,7 +435,7 @@ class BayesNet:
             child.parents.append(parent)
 
     def _parse_CPT(self, node_name):
-        cpt_lines = [num for num, line in enumerate(self.text) if line.strip(":") == "cpt for {}".format(node_name)]
+        cpt_lines = self.cpt_lines.get(node_name, [])
         if not cpt_lines:
             self._error("No CPT for \"{}\" given".format(node_name))
         elif len(cpt_lines) > 1:
@@ -211,6 +468,7 @@ class BayesNet:
             )
         node.values = headers[len(parents):]
         num_rows = my_product(len(self.nodes[parent_name].values) for parent_name in header_parents)
+        keys = set()
         for line_diff in range(num_rows):
             try:
                 row = self.text[line_num + line_diff + 2]
@@ -232,7 +490,7 @@ class BayesNet:
                             parent_name,
                             line_diff + 1,
                             node.name))
-            if key in node.cpt:
+            if key in keys:
                 self._error(
                     "The probabilities for \"{}\" when ({}) has been specified twice".format(
                         node.name,
@@ -255,94 +513,218 @@ class BayesNet:
                         line_diff + 1,
                         node_name,
                         ("{} = {}".format(" + ".join(str(prob[1]) for prob in probs), sum(prob[1] for prob in probs)))))
+            keys.add(key)
             node.cpt.append((key, probs))
+        node.compile_cpt()
         return line_num + num_rows + 1
 
     def _check_dag(self):
-        # order nodes topologically for reading CPTs
-        level = set(node for node in self.nodes.values() if len(node.parents) == 0)
-        visited = set()
-        while level:
-            new_level = set()
-            for parent in level:
-                if parent.depth > len(self.nodes):
-                    self._error("There is a loop in the Bayesian network")
-                for child in parent.children:
-                    child.depth = parent.depth + 1
-                    new_level.add(child)
-                visited.add(parent)
-            level = new_level
+        # order nodes topologically for reading CPTs (Kahn's algorithm), with
+        # the depth of each node being the longest path to it
+        num_parents = dict((node, len(set(node.parents))) for node in self.nodes.values())
+        queue = deque(node for node, count in num_parents.items() if count == 0)
+        num_ordered = 0
+        while queue:
+            parent = queue.popleft()
+            num_ordered += 1
+            for child in parent.children:
+                child.depth = max(child.depth, parent.depth + 1)
+                num_parents[child] -= 1
+                if num_parents[child] == 0:
+                    queue.append(child)
+        if num_ordered < len(self.nodes):
+            self._error("There is a loop in the Bayesian network")
 
     @property
     def has_errors(self):
         return self.error is not None
 
     def infer(self, evidence):
-        # reset all nodes
-        for node in self.nodes.values():
-            node.reset()
-        # record new observations
+        self.observations = dict(evidence)
+        self.stats = InferenceStats()
+        start = perf_counter()
+        try:
+            self.posteriors, self.posterior_errors = self._posteriors(evidence)
+        except ValueError as error:
+            self._error(str(error))
+        finally:
+            self.timings["inference"] = perf_counter() - start
+
+    def stats_summary(self):
+        """Summarize the work done by the latest inference.
+
+        Returns:
+            Dict[str, Any]: The number of nodes needed for the largest
+                posterior after pruning, the size of the largest factor or
+                enumeration, the number of multiplications, the seconds
+                taken by each posterior computed on its own, and the
+                seconds taken to parse, infer, and render the network.
+        """
+        return {
+            "method": self.method,
+            "relevant_nodes": self.stats.relevant_nodes,
+            "largest_factor": self.stats.largest_factor,
+            "multiplications": self.stats.multiplications,
+            "node_seconds": dict(self.stats.node_seconds),
+            "seconds": dict(self.timings),
+        }
+
+    def query_batch(self, scenarios, targets=None):
+        """Infer posteriors for several sets of observations of the network.
+
+        The parsed network, and for junction trees any messages that do not
+        depend on the observations that differ, are shared by all scenarios.
+
+        Arguments:
+            scenarios (Iterable[Mapping[str, str]]): The observed values of
+                each scenario, by node name.
+            targets (Iterable[str]): The names of the nodes to report the
+                posteriors of, which must be in the network. Defaults to all
+                nodes.
+
+        Returns:
+            List[Scenario]: The posteriors (and standard errors, if sampled)
+                of each scenario, or an error message if the observations
+                are invalid or impossible.
+        """
+        if targets is None:
+            targets = list(self.nodes)
+        self.stats = InferenceStats()
+        results = []
+        for evidence in scenarios:
+            try:
+                for node_name, value in evidence.items():
+                    if node_name not in self.nodes:
+                        raise ValueError("There is no \"{}\" to be observed.".format(node_name))
+                    if value not in self.nodes[node_name].values:
+                        raise ValueError("\"{}\" is not a valid observation of \"{}\".".format(value, node_name))
+                posteriors, posterior_errors = self._posteriors(evidence, targets)
+            except ValueError as error:
+                results.append(Scenario({}, {}, "Error: " + str(error)))
+                continue
+            results.append(Scenario(
+                dict((name, posteriors[name]) for name in targets),
+                dict((name, posterior_errors[name]) for name in targets if name in posterior_errors),
+                None,
+            ))
+        return results
+
+    def _posteriors(self, evidence, targets=None):
+        posteriors = {}
+        posterior_errors = {}
         for node_name, value in evidence.items():
-            self.nodes[node_name].observe(value)
-        # infer posterior for all nodes
-        for node in self.nodes.values():
-            if node.name not in evidence:
-                node.posterior = self._infer(node, evidence)
+            posteriors[node_name] = dict((v, 1 if v == value else 0) for v in self.nodes[node_name].values)
+        if targets is None:
+            queries = list(self.nodes.values())
+        else:
+            queries = [self.nodes[node_name] for node_name in targets]
+        # infer posterior for all queried nodes
+        if self.method == "junction_tree":
+            junction_tree = self.compiled.junction_tree(self.ordering)
+            encoded = self._encode(evidence)
+            self.stats.unpruned.extend((node, encoded) for node in queries if node not in encoded)
+            marginals = junction_tree.marginals(encoded, PRECISIONS[self.precision], queries, self.stats)
+            for node in queries:
+                if node.name not in evidence:
+                    posteriors[node.name] = self._normalize(marginals[node])
+        elif self.method in SAMPLERS:
+            encoded = self._encode(evidence)
+            # nodes that are not ancestors of a query or the evidence are barren
+            sampled_nodes = set(queries).union(encoded, *(node.ancestors() for node in chain(queries, encoded)))
+            self.stats.relevant_nodes = max(self.stats.relevant_nodes, len(sampled_nodes))
+            sampler = SAMPLERS[self.method](sampled_nodes, encoded, self.seed)
+            estimate = sampler.run(self.num_samples, self.time_limit)
+            if estimate is None:
+                raise ValueError(IMPOSSIBLE_EVIDENCE)
+            for node in queries:
+                if node.name not in evidence:
+                    posteriors[node.name] = estimate.posteriors[node]
+                    posterior_errors[node.name] = estimate.errors[node]
+        else:
+            for node in queries:
+                if node.name not in evidence:
+                    start = perf_counter()
+                    posteriors[node.name] = self._infer(node, evidence)
+                    self.stats.node_seconds[node.name] = perf_counter() - start
+        return posteriors, posterior_errors
+
+    def _encode(self, evidence):
+        return dict((self.nodes[name], self.nodes[name].codes[value]) for name, value in evidence.items())
+
+    def _normalize(self, result):
+        total = sum(result.values())
+        if total == 0:
+            raise ValueError(IMPOSSIBLE_EVIDENCE)
+        for key in result:
+            result[key] /= total
+        return result
 
     def _infer(self, query, evidence):
-        evidence = dict((self.nodes[name], value) for name, value in evidence.items())
-        queue = [query,] + list(evidence.keys())
-        relevant_nodes = set(queue)
-        while queue:
-            node = queue.pop(0)
-            queue.extend(parent for parent in node.parents if parent not in relevant_nodes)
-            relevant_nodes.update(node.parents)
+        evidence = self._encode(evidence)
+        needed_nodes, constant_nodes = relevant_nodes(query, evidence)
+        self.stats.relevant_nodes = max(self.stats.relevant_nodes, len(needed_nodes))
+        # the CPTs of fully observed families are absorbed as constants,
+        # which only need to be checked for impossible evidence
+        for node in constant_nodes:
+            family = (*node.parents, node)
+            if node.table[sum(stride * evidence[other] for other, stride in zip(family, node.strides))] == 0:
+                raise ValueError(IMPOSSIBLE_EVIDENCE)
+        if self.method == "enumeration":
+            result = self._enumerate(query, evidence, needed_nodes)
+        else:
+            result = variable_elimination(
+                query, evidence, needed_nodes, self.ordering, PRECISIONS[self.precision], self.stats
+            )
+        return self._normalize(result)
+
+    def _enumerate(self, query, evidence, relevant_nodes):
         unobserved_nodes = sorted(
             set(node for node in relevant_nodes
                 if node.name != query.name and node not in evidence),
             key=(lambda n: n.name))
+        num_assignments = len(query.values) * my_product(len(node.values) for node in unobserved_nodes)
+        self.stats.largest_factor = max(self.stats.largest_factor, num_assignments)
+        self.stats.multiplications += num_assignments * len(relevant_nodes)
         result = {}
-        for value in query.values:
+        for code, value in enumerate(query.values):
             sigma = 0
-            for assignment in product(*(node.values for node in unobserved_nodes)):
+            for assignment in product(*(range(len(node.values)) for node in unobserved_nodes)):
                 assignment = dict(zip(unobserved_nodes, assignment))
                 assignment.update(evidence)
-                assignment[query] = value
+                assignment[query] = code
                 pi = 1
                 for node in relevant_nodes:
-                    key = tuple(
-                        (parent.name, assignment[parent])
-                        for parent in sorted(node.parents, key=(lambda n: n.name))
-                    )
-                    pi *= dict(dict((tuple(sorted(key)), value) for key, value in node.cpt)[key])[assignment[node]]
+                    pi *= node.table[sum(
+                        stride * assignment[parent]
+                        for parent, stride in zip(node.parents, node.strides)
+                    ) + assignment[node]]
                 sigma += pi
             result[value] = sigma
-        total = sum(result.values())
-        if total == 0:
-            self._error('The observations are statistically impossible (have posterior probability of 0%)')
-        for key in result:
-            result[key] /= total
         return result
 
     def dot(self):
+        start = perf_counter()
         result = []
         result.append('digraph {')
         for node in sorted(self.nodes.values(), key=(lambda node: (node.depth, node.name))):
             result.append('    subgraph "_{}" {{'.format(node.name))
             result.append('        rank=same')
             result.append('        "{}"'.format(node.name))
-            if node.posterior:
-                if node.observation is not None:
+            if self.posteriors.get(node.name):
+                if node.name in self.observations:
                     result.append(
                         '        "{}_cpt" [shape=box, fontname=Courier, penwidth=3, label="{}"]'.format(
-                            node.name, node.observation
+                            node.name, self.observations[node.name]
                         )
                     )
                 else:
+                    posterior_string = node.posterior_string(
+                        self.posteriors[node.name], self.posterior_errors.get(node.name)
+                    )
                     result.append(
                         '        "{}_cpt" [shape=box, fontname=Courier, label=\"{}\"]'.format(
                             node.name,
-                            node.posterior_string().replace("\n", "\\n")
+                            posterior_string.replace("\n", "\\n")
                         )
                     )
             else:
@@ -358,4 +740,6 @@ class BayesNet:
             for child in node.children:
                 result.append('    "{}" -> "{}"'.format(node.name, child.name))
         result.append('}')
-        return "\n".join(result)
+        result = "\n".join(result)
+        self.timings["dot"] = perf_counter() - start
+        return result
@@ -0,0 +1,654 @@
+"""Exact inference on Bayes networks by variable elimination and junction trees.
+
+Factors can hold exact Fractions, or, if NumPy is installed, float64 arrays
+of either probabilities or log probabilities.
+"""
+
+from collections import OrderedDict, deque
+from functools import reduce
+from heapq import heapify, heappop, heappush
+from math import prod
+from threading import Lock
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the number of sets of evidence to keep junction tree messages for
+MESSAGE_CACHE_SIZE = 8
+
+
+def strides(nodes):
+    """Calculate the row-major strides of a table over some nodes.
+
+    Arguments:
+        nodes (Sequence[Node]): The nodes, with the last varying fastest.
+
+    Returns:
+        Tuple[int, ...]: The distance between consecutive values of each node.
+    """
+    result = []
+    stride = 1
+    for node in reversed(nodes):
+        result.append(stride)
+        stride *= len(node.values)
+    return tuple(reversed(result))
+
+
+def offsets(cards, node_strides, base=0):
+    """List the table offsets of every assignment, in row-major order.
+
+    Arguments:
+        cards (Sequence[int]): The number of values of each node.
+        node_strides (Sequence[int]): The stride of each node in the table,
+            or 0 if the table does not depend on it.
+        base (int): The offset of the first assignment.
+
+    Returns:
+        List[int]: The offsets.
+    """
+    result = [base]
+    for card, stride in zip(cards, node_strides):
+        result = [offset + code * stride for offset in result for code in range(card)]
+    return result
+
+
+class Factor:
+    """A table from the joint values of some nodes to numbers."""
+
+    def __init__(self, nodes, table):
+        """Initialize the Factor.
+
+        Arguments:
+            nodes (Sequence[Node]): The nodes the factor is over.
+            table (List[Fraction]): The value of the factor for each
+                assignment, in row-major order over the nodes.
+        """
+        self.nodes = tuple(nodes)
+        self.table = table
+        self.strides = strides(self.nodes)
+
+    @classmethod
+    def from_cpt(cls, node):
+        """Create the factor of a node's conditional probability table.
+
+        Arguments:
+            node (Node): The node.
+
+        Returns:
+            Factor: The factor over the parents of the node and the node.
+        """
+        return cls((*node.parents, node), node.table)
+
+    @classmethod
+    def unit(cls, nodes):
+        """Create a factor that is 1 everywhere.
+
+        Arguments:
+            nodes (Sequence[Node]): The nodes the factor is over.
+
+        Returns:
+            Factor: The factor.
+        """
+        return cls(nodes, prod(len(node.values) for node in nodes) * [1])
+
+    def restrict(self, evidence):
+        """Fix the values of observed nodes and remove them from the factor.
+
+        Arguments:
+            evidence (Mapping[Node, int]): The observed value codes.
+
+        Returns:
+            Factor: The restricted factor.
+        """
+        if not any(node in evidence for node in self.nodes):
+            return self
+        base = sum(
+            stride * evidence[node]
+            for node, stride in zip(self.nodes, self.strides)
+            if node in evidence
+        )
+        kept = [index for index, node in enumerate(self.nodes) if node not in evidence]
+        table = [
+            self.table[offset] for offset in offsets(
+                [len(self.nodes[index].values) for index in kept],
+                [self.strides[index] for index in kept],
+                base,
+            )
+        ]
+        return Factor((self.nodes[index] for index in kept), table)
+
+    def multiply(self, other):
+        """Multiply two factors.
+
+        Arguments:
+            other (Factor): The other factor.
+
+        Returns:
+            Factor: The product, over the nodes of both factors.
+        """
+        nodes = self.nodes + tuple(node for node in other.nodes if node not in self.nodes)
+        cards = [len(node.values) for node in nodes]
+        self_strides = dict(zip(self.nodes, self.strides))
+        other_strides = dict(zip(other.nodes, other.strides))
+        self_offsets = offsets(cards, [self_strides.get(node, 0) for node in nodes])
+        other_offsets = offsets(cards, [other_strides.get(node, 0) for node in nodes])
+        table = [
+            self.table[self_offset] * other.table[other_offset]
+            for self_offset, other_offset in zip(self_offsets, other_offsets)
+        ]
+        return Factor(nodes, table)
+
+    def sum_out(self, node):
+        """Marginalize a node out of the factor.
+
+        Arguments:
+            node (Node): The node to sum over.
+
+        Returns:
+            Factor: The factor over the remaining nodes.
+        """
+        position = self.nodes.index(node)
+        nodes = self.nodes[:position] + self.nodes[position + 1:]
+        node_strides = self.strides[:position] + self.strides[position + 1:]
+        stride = self.strides[position]
+        codes = range(len(node.values))
+        table = [
+            sum(self.table[offset + code * stride] for code in codes)
+            for offset in offsets([len(other.values) for other in nodes], node_strides)
+        ]
+        return Factor(nodes, table)
+
+    def probabilities(self):
+        """List the values of a factor over a single node.
+
+        Returns:
+            List[Fraction]: The (unnormalized) probability of each value.
+        """
+        return list(self.table)
+
+
+class ArrayFactor(Factor):
+    """A factor of float64 probabilities, with an array axis for each node."""
+
+    @classmethod
+    def from_cpt(cls, node):
+        nodes = (*node.parents, node)
+        table = np.array(node.table, dtype=np.float64).reshape([len(other.values) for other in nodes])
+        return cls(nodes, table)
+
+    @classmethod
+    def unit(cls, nodes):
+        return cls(nodes, np.ones([len(node.values) for node in nodes]))
+
+    def restrict(self, evidence):
+        if not any(node in evidence for node in self.nodes):
+            return self
+        index = tuple(evidence.get(node, slice(None)) for node in self.nodes)
+        return type(self)((node for node in self.nodes if node not in evidence), self.table[index])
+
+    def expand(self, nodes):
+        """View the table with an axis for each of some nodes.
+
+        Arguments:
+            nodes (Sequence[Node]): The nodes, which must include all the
+                nodes of this factor.
+
+        Returns:
+            numpy.ndarray: The table, with size-1 axes for the other nodes.
+        """
+        axes = [self.nodes.index(node) for node in nodes if node in self.nodes]
+        shape = [len(node.values) if node in self.nodes else 1 for node in nodes]
+        return self.table.transpose(axes).reshape(shape)
+
+    def multiply(self, other):
+        nodes = self.nodes + tuple(node for node in other.nodes if node not in self.nodes)
+        return type(self)(nodes, self.expand(nodes) * other.expand(nodes))
+
+    def sum_out(self, node):
+        position = self.nodes.index(node)
+        nodes = self.nodes[:position] + self.nodes[position + 1:]
+        return type(self)(nodes, self.table.sum(axis=position))
+
+    def probabilities(self):
+        return [float(value) for value in self.table.ravel()]
+
+
+class LogFactor(ArrayFactor):
+    """A factor of float64 log probabilities, which do not underflow."""
+
+    @classmethod
+    def from_cpt(cls, node):
+        factor = ArrayFactor.from_cpt(node)
+        with np.errstate(divide="ignore"):
+            return cls(factor.nodes, np.log(factor.table))
+
+    @classmethod
+    def unit(cls, nodes):
+        return cls(nodes, np.zeros([len(node.values) for node in nodes]))
+
+    def multiply(self, other):
+        nodes = self.nodes + tuple(node for node in other.nodes if node not in self.nodes)
+        return type(self)(nodes, self.expand(nodes) + other.expand(nodes))
+
+    def sum_out(self, node):
+        position = self.nodes.index(node)
+        nodes = self.nodes[:position] + self.nodes[position + 1:]
+        return type(self)(nodes, np.logaddexp.reduce(self.table, axis=position))
+
+    def probabilities(self):
+        # rescale so the largest value is 1, since only the ratios matter
+        table = self.table.ravel()
+        largest = table.max()
+        if largest == -np.inf:
+            return [0.0 for _ in table]
+        return [float(value) for value in np.exp(table - largest)]
+
+
+PRECISIONS = {
+    "exact": Factor,
+    "float": ArrayFactor,
+    "log": LogFactor,
+}
+
+
+class InferenceStats:
+    """Counts of the work done by inference, to find exponential blowup."""
+
+    def __init__(self):
+        """Initialize the InferenceStats."""
+        self.multiplications = 0
+        self.largest_factor = 0
+        self._relevant_nodes = 0
+        # the queries and evidence of posteriors computed without pruning,
+        # such as by a junction tree, which are only pruned if asked for
+        self.unpruned = []
+        # the seconds taken by each posterior computed on its own
+        self.node_seconds = {}
+
+    @property
+    def relevant_nodes(self):
+        """int: The most nodes needed for any posterior, after pruning."""
+        while self.unpruned:
+            query, evidence = self.unpruned.pop()
+            self._relevant_nodes = max(self._relevant_nodes, len(relevant_nodes(query, evidence)[0]))
+        return self._relevant_nodes
+
+    @relevant_nodes.setter
+    def relevant_nodes(self, value):
+        self._relevant_nodes = value
+
+    def record(self, size):
+        """Record the entries of a table that had to be computed.
+
+        Arguments:
+            size (int): The number of entries in the table.
+        """
+        self.multiplications += size
+        self.largest_factor = max(self.largest_factor, size)
+
+    def add(self, other):
+        """Add the multiplications and largest factor of other work.
+
+        Arguments:
+            other (InferenceStats): The counts of the work.
+        """
+        self.multiplications += other.multiplications
+        self.largest_factor = max(self.largest_factor, other.largest_factor)
+
+    def multiply(self, first, second):
+        """Multiply two factors, counting the entries of the product.
+
+        Arguments:
+            first (Factor): The first factor.
+            second (Factor): The second factor.
+
+        Returns:
+            Factor: The product.
+        """
+        result = first.multiply(second)
+        self.record(prod(len(node.values) for node in result.nodes))
+        return result
+
+
+def interaction_graph(scopes):
+    """Connect every pair of nodes that appear in a factor together.
+
+    Arguments:
+        scopes (Iterable[Sequence[Node]]): The nodes of each factor.
+
+    Returns:
+        Dict[Node, Set[Node]]: The neighbors of each node.
+    """
+    neighbors = {}
+    for scope in scopes:
+        for node in scope:
+            neighbors.setdefault(node, set()).update(other for other in scope if other is not node)
+    return neighbors
+
+
+def eliminate(neighbors, node):
+    """Remove a node from an interaction graph, connecting its neighbors.
+
+    Arguments:
+        neighbors (Dict[Node, Set[Node]]): The graph, which is modified.
+        node (Node): The node to remove.
+
+    Returns:
+        Set[Node]: The neighbors of the node.
+    """
+    adjacent = neighbors.pop(node, set())
+    for neighbor in adjacent:
+        neighbors[neighbor].discard(node)
+        neighbors[neighbor].update(other for other in adjacent if other is not neighbor)
+    return adjacent
+
+
+def elimination_order(scopes, nodes, heuristic="min_fill"):
+    """Greedily order nodes for elimination.
+
+    Arguments:
+        scopes (Iterable[Sequence[Node]]): The nodes of each factor.
+        nodes (Iterable[Node]): The nodes to eliminate.
+        heuristic (str): Either "min_fill", to first eliminate the node that
+            adds the fewest edges to the interaction graph, or "min_degree",
+            to first eliminate the node with the fewest neighbors.
+
+    Returns:
+        List[Node]: The nodes in order of elimination.
+    """
+    neighbors = interaction_graph(scopes)
+
+    def cost(node):
+        if heuristic == "min_degree":
+            return len(neighbors[node])
+        adjacent = list(neighbors[node])
+        return sum(
+            1 for index, first in enumerate(adjacent) for second in adjacent[index + 1:]
+            if second not in neighbors[first]
+        )
+
+    remaining = set(nodes)
+    costs = {node: cost(node) for node in remaining}
+    heap = [(node_cost, node.name, node) for node, node_cost in costs.items()]
+    heapify(heap)
+    order = []
+    while heap:
+        node_cost, _, node = heappop(heap)
+        if node not in remaining or costs[node] != node_cost:
+            continue
+        remaining.remove(node)
+        order.append(node)
+        adjacent = eliminate(neighbors, node)
+        # only the costs of nodes near the new edges can change
+        affected = set(adjacent)
+        for neighbor in adjacent:
+            affected.update(neighbors[neighbor])
+        for other in affected & remaining:
+            other_cost = cost(other)
+            if other_cost != costs[other]:
+                costs[other] = other_cost
+                heappush(heap, (other_cost, other.name, other))
+    return order
+
+
+def relevant_nodes(query, evidence):
+    """Find the nodes whose CPTs affect the posterior of a node.
+
+    Nodes that are not ancestors of the query or the evidence are barren,
+    and nodes that the evidence d-separates from the query only scale the
+    distribution, so neither is needed. What remains is found by searching
+    the moral graph of the ancestors, without the observed nodes, outward
+    from the query.
+
+    Arguments:
+        query (Node): The node to compute the distribution of.
+        evidence (Mapping[Node, int]): The observed value codes.
+
+    Returns:
+        Tuple[Set[Node], List[Node]]: The nodes whose CPTs are needed, and
+            the nodes whose CPTs become constant once the evidence is
+            absorbed, because the node and its parents are all observed.
+    """
+    ancestral = set([query]).union(evidence, query.ancestors(), *(node.ancestors() for node in evidence))
+    families = dict(
+        (node, [other for other in (*node.parents, node) if other not in evidence])
+        for node in ancestral
+    )
+    # the families each unobserved node is part of
+    memberships = {}
+    for node, family in families.items():
+        for other in family:
+            memberships.setdefault(other, []).append(node)
+    connected = set([query])
+    queue = [query]
+    while queue:
+        node = queue.pop()
+        for member in memberships[node]:
+            for other in families[member]:
+                if other not in connected:
+                    connected.add(other)
+                    queue.append(other)
+    needed = set(node for node, family in families.items() if any(other in connected for other in family))
+    constant = [node for node, family in families.items() if not family]
+    return needed, constant
+
+
+def variable_elimination(query, evidence, nodes, heuristic="min_fill", factor_class=Factor, stats=None):
+    """Compute the unnormalized distribution of a node given evidence.
+
+    Arguments:
+        query (Node): The node to compute the distribution of.
+        evidence (Mapping[Node, int]): The observed value codes.
+        nodes (Iterable[Node]): The nodes whose CPTs are needed, as found by
+            relevant_nodes().
+        heuristic (str): The elimination ordering heuristic.
+        factor_class (type): The Factor class, which determines the
+            arithmetic used.
+        stats (InferenceStats): The counts to add the multiplications to,
+            if any.
+
+    Returns:
+        Dict[str, Fraction]: The joint probability of each value of the
+            query with the evidence, up to a constant factor.
+    """
+    if stats is None:
+        stats = InferenceStats()
+    nodes = set(nodes)
+    factors = [factor_class.from_cpt(node).restrict(evidence) for node in nodes]
+    hidden = [node for node in nodes if node is not query and node not in evidence]
+    for node in elimination_order([factor.nodes for factor in factors], hidden, heuristic):
+        related = [factor for factor in factors if node in factor.nodes]
+        factors = [factor for factor in factors if node not in factor.nodes]
+        factors.append(reduce(stats.multiply, related).sum_out(node))
+    result = reduce(stats.multiply, factors)
+    return dict(zip(query.values, result.probabilities()))
+
+
+class JunctionTree:
+    """A tree of the cliques of a triangulated Bayes network.
+
+    Passing messages up and then down the tree calibrates every clique, so
+    that the posteriors of all nodes are computed at once. The tree only
+    depends on the structure of the network, so it can be reused for any
+    evidence. Messages are cached by the evidence in the part of the tree
+    they come from, so changing some observations only recomputes the
+    messages that flow away from them.
+    """
+
+    def __init__(self, nodes, heuristic="min_fill"):
+        """Initialize the JunctionTree.
+
+        Arguments:
+            nodes (Iterable[Node]): All nodes of the network.
+            heuristic (str): The elimination ordering heuristic used to
+                triangulate the network.
+        """
+        nodes = list(nodes)
+        scopes = [(*node.parents, node) for node in nodes]
+        # eliminating nodes in order triangulates the moral graph, and each
+        # elimination clique joins the clique of its first-eliminated neighbor
+        order = elimination_order(scopes, nodes, heuristic)
+        position = dict((node, index) for index, node in enumerate(order))
+        neighbors = interaction_graph(scopes)
+        self.cliques = []
+        # the clique made when each node was eliminated, the node whose
+        # clique each clique joins, and the size of the separator between them
+        clique_of = {}
+        joins = []
+        separator_sizes = []
+        # the cliques waiting to join the clique of each node
+        waiting = {}
+        for node in order:
+            separator = eliminate(neighbors, node)
+            # a clique is not maximal if a clique joining it has the same separator
+            index = next(
+                (other for other in waiting.get(node, ()) if separator_sizes[other] == len(separator) + 1), None
+            )
+            if index is None:
+                index = len(self.cliques)
+                self.cliques.append(tuple(sorted(separator | set([node]), key=(lambda n: n.name))))
+                joins.append(None)
+                separator_sizes.append(None)
+            clique_of[node] = index
+            joins[index] = min(separator, key=position.get) if separator else None
+            separator_sizes[index] = len(separator)
+            if separator:
+                waiting.setdefault(joins[index], []).append(index)
+        self.neighbors = [[] for _ in self.cliques]
+        root = None
+        for index, node in enumerate(joins):
+            # the trees of disconnected parts of the network are joined by empty separators
+            if node is None:
+                other, root = root, index
+            else:
+                other = clique_of[node]
+            if other is not None:
+                self.neighbors[index].append(other)
+                self.neighbors[other].append(index)
+        # order the edges from the root down
+        self.edges = []
+        visited = set([0])
+        queue = deque([0] if self.cliques else [])
+        while queue:
+            parent = queue.popleft()
+            for child in self.neighbors[parent]:
+                if child not in visited:
+                    visited.add(child)
+                    self.edges.append((parent, child))
+                    queue.append(child)
+        # each CPT goes in the clique of the first eliminated node of its
+        # family, which contains the whole family; each node reads its
+        # posterior from the clique made when it was eliminated
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = Lock()
+        self.assigned = [[] for _ in self.cliques]
+        for node, scope in zip(nodes, scopes):
+            self.assigned[clique_of[min(scope, key=position.get)]].append(node)
+        self.home = dict((node, clique_of[node]) for node in nodes)
+
+    def marginals(self, evidence, factor_class=Factor, nodes=None, stats=None):
+        """Compute the unnormalized distribution of every unobserved node.
+
+        Arguments:
+            evidence (Mapping[Node, int]): The observed value codes.
+            factor_class (type): The Factor class, which determines the
+                arithmetic used.
+            nodes (Iterable[Node]): The nodes to compute the distribution
+                of. Defaults to all nodes.
+            stats (InferenceStats): The counts to add the multiplications
+                to, if any. Cached potentials and messages count the work it
+                took to compute them.
+
+        Returns:
+            Dict[Node, Dict[str, Fraction]]: The joint probability of each
+                value of each node with the evidence, up to a constant factor.
+        """
+        if stats is None:
+            stats = InferenceStats()
+        # the evidence that each clique and message depends on
+        clique_evidence = [
+            frozenset((node, evidence[node]) for node in clique if node in evidence)
+            for clique in self.cliques
+        ]
+        message_evidence = {}
+        potentials = {}
+
+        def potential(index):
+
+            def compute(work):
+                result = factor_class.unit([node for node in self.cliques[index] if node not in evidence])
+                for node in self.assigned[index]:
+                    result = work.multiply(result, factor_class.from_cpt(node).restrict(evidence))
+                return result
+
+            if index not in potentials:
+                potentials[index] = self._cached(
+                    ("potential", index, factor_class, clique_evidence[index]), compute, stats
+                )
+            return potentials[index]
+
+        messages = {}
+
+        def send(source, target):
+            incoming = [other for other in self.neighbors[source] if other != target]
+            message_evidence[(source, target)] = clique_evidence[source].union(
+                *(message_evidence[(other, source)] for other in incoming)
+            )
+
+            source_potential = potential(source)
+
+            def compute(work):
+                result = reduce(work.multiply, [source_potential] + [
+                    messages[(other, source)] for other in incoming
+                ])
+                for node in result.nodes:
+                    if node not in self.cliques[target]:
+                        result = result.sum_out(node)
+                return result
+
+            messages[(source, target)] = self._cached(
+                ("message", source, target, factor_class, message_evidence[(source, target)]), compute, stats
+            )
+
+        for parent, child in reversed(self.edges):
+            send(child, parent)
+        for parent, child in self.edges:
+            send(parent, child)
+        beliefs = {}
+        result = {}
+        for node in (self.home if nodes is None else nodes):
+            if node in evidence:
+                continue
+            index = self.home[node]
+            if index not in beliefs:
+                beliefs[index] = reduce(stats.multiply, [potential(index)] + [
+                    messages[(other, index)] for other in self.neighbors[index]
+                ])
+            belief = beliefs[index]
+            for other in belief.nodes:
+                if other is not node:
+                    belief = belief.sum_out(other)
+            result[node] = dict(zip(node.values, belief.probabilities()))
+        return result
+
+    def _cached(self, key, compute, stats):
+        with self.lock:
+            if key in self.cache:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+                value, work = self.cache[key]
+                stats.add(work)
+                return value
+            self.cache_misses += 1
+        work = InferenceStats()
+        value = compute(work)
+        stats.add(work)
+        with self.lock:
+            self.cache[key] = value, work
+            while len(self.cache) > MESSAGE_CACHE_SIZE * (2 * len(self.edges) + len(self.cliques)):
+                self.cache.popitem(last=False)
+        return value
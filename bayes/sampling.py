@@ -0,0 +1,262 @@
+"""Approximate inference on Bayes networks by sampling.
+
+The samplers draw many samples at once as NumPy arrays of value codes, and
+report the standard error of each posterior along with the estimate.
+"""
+
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BATCH_SIZE = 1000
+GIBBS_CHAINS = 100
+GIBBS_BURN_IN = 20
+
+Estimate = namedtuple("Estimate", "posteriors, errors, num_samples")
+
+
+class Sampler(ABC):
+    """Estimates posteriors from batches of samples of a network."""
+
+    def __init__(self, nodes, evidence, seed=None):
+        """Initialize the Sampler.
+
+        Arguments:
+            nodes (Iterable[Node]): The nodes to sample, which must include
+                the ancestors of every node.
+            evidence (Mapping[Node, int]): The observed value codes.
+            seed (int): The seed of the random number generator.
+        """
+        # parents come before their children
+        self.nodes = sorted(nodes, key=(lambda node: (node.depth, node.name)))
+        self.evidence = evidence
+        self.unobserved = [node for node in self.nodes if node not in evidence]
+        self.rng = np.random.default_rng(seed)
+        self.tables = dict((node, np.array(node.table, dtype=np.float64)) for node in self.nodes)
+
+    def probabilities(self, node, codes, size):
+        """Look up the CPT row of a node for each sample.
+
+        Arguments:
+            node (Node): The node.
+            codes (Mapping[Node, numpy.ndarray]): The value codes of (at
+                least) the parents of the node in each sample.
+            size (int): The number of samples.
+
+        Returns:
+            numpy.ndarray: The probability of each value of the node, with
+                one row per sample.
+        """
+        offset = np.zeros(size, dtype=np.int64)
+        for parent, stride in zip(node.parents, node.strides):
+            offset = offset + stride * codes[parent]
+        return self.tables[node][np.add.outer(offset, np.arange(len(node.values)))]
+
+    def choose(self, probs):
+        """Sample a value code from each row of (unnormalized) probabilities.
+
+        Arguments:
+            probs (numpy.ndarray): The probabilities, with one row per sample.
+
+        Returns:
+            numpy.ndarray: The chosen code for each row.
+        """
+        cumulative = probs.cumsum(axis=1)
+        thresholds = self.rng.random(len(probs)) * cumulative[:, -1]
+        return np.minimum((thresholds[:, None] >= cumulative).sum(axis=1), probs.shape[1] - 1)
+
+    def forward_sample(self, size):
+        """Sample every node from its parents, fixing the observed nodes.
+
+        Arguments:
+            size (int): The number of samples.
+
+        Returns:
+            Tuple[Dict[Node, numpy.ndarray], numpy.ndarray]: The value codes
+                of each node, and the log likelihood of the evidence in
+                each sample.
+        """
+        codes = {}
+        log_weights = np.zeros(size)
+        for node in self.nodes:
+            probs = self.probabilities(node, codes, size)
+            if node in self.evidence:
+                codes[node] = np.full(size, self.evidence[node])
+                with np.errstate(divide="ignore"):
+                    log_weights += np.log(probs[:, self.evidence[node]])
+            else:
+                codes[node] = self.choose(probs)
+        return codes, log_weights
+
+    @abstractmethod
+    def batch(self, size):
+        """Draw a batch of samples.
+
+        Arguments:
+            size (int): The requested number of samples.
+
+        Returns:
+            int: The number of samples drawn.
+        """
+
+    @abstractmethod
+    def estimate(self, num_samples):
+        """Estimate the posteriors from the samples so far.
+
+        Arguments:
+            num_samples (int): The number of samples drawn.
+
+        Returns:
+            Estimate: The estimate, or None if the evidence is impossible.
+        """
+
+    def run(self, num_samples=10000, time_limit=None):
+        """Sample until either budget runs out.
+
+        Arguments:
+            num_samples (int): The maximum number of samples.
+            time_limit (float): The maximum number of seconds, if any. At
+                least one batch is always drawn.
+
+        Returns:
+            Estimate: The estimate, or None if the evidence is impossible.
+        """
+        start = perf_counter()
+        drawn = 0
+        while drawn < num_samples:
+            if drawn and time_limit is not None and perf_counter() - start > time_limit:
+                break
+            drawn += self.batch(min(BATCH_SIZE, num_samples - drawn))
+        return self.estimate(drawn)
+
+
+class LikelihoodWeighting(Sampler):
+    """Forward samples weighted by the likelihood of the evidence."""
+
+    def __init__(self, nodes, evidence, seed=None):
+        super().__init__(nodes, evidence, seed)
+        # weights are kept relative to the largest log weight seen, to avoid underflow
+        self.shift = -np.inf
+        self.total_weight = 0
+        self.total_squared_weight = 0
+        self.weighted_counts = dict((node, np.zeros(len(node.values))) for node in self.unobserved)
+
+    def batch(self, size):
+        codes, log_weights = self.forward_sample(size)
+        shift = max(self.shift, log_weights.max())
+        if shift == -np.inf:
+            return size
+        scale = 0 if self.shift == -np.inf else np.exp(self.shift - shift)
+        self.shift = shift
+        weights = np.exp(log_weights - shift)
+        self.total_weight = scale * self.total_weight + weights.sum()
+        self.total_squared_weight = scale ** 2 * self.total_squared_weight + (weights ** 2).sum()
+        for node, counts in self.weighted_counts.items():
+            self.weighted_counts[node] = scale * counts + np.bincount(
+                codes[node], weights=weights, minlength=len(node.values)
+            )
+        return size
+
+    def estimate(self, num_samples):
+        if self.total_weight == 0:
+            return None
+        effective_samples = self.total_weight ** 2 / self.total_squared_weight
+        posteriors = {}
+        errors = {}
+        for node, counts in self.weighted_counts.items():
+            posterior = counts / self.total_weight
+            posteriors[node] = dict(zip(node.values, posterior.tolist()))
+            variance = np.clip(posterior * (1 - posterior), 0, None) / effective_samples
+            errors[node] = dict(zip(node.values, np.sqrt(variance).tolist()))
+        return Estimate(posteriors, errors, num_samples)
+
+
+class GibbsSampler(Sampler):
+    """Parallel Markov chains that resample one node at a time.
+
+    Chains cannot move between states separated by zero probabilities, so
+    networks with deterministic CPTs are better sampled by likelihood
+    weighting.
+    """
+
+    def __init__(self, nodes, evidence, seed=None):
+        super().__init__(nodes, evidence, seed)
+        self.codes, _ = self.forward_sample(GIBBS_CHAINS)
+        self.counts = dict((node, np.zeros((GIBBS_CHAINS, len(node.values)))) for node in self.unobserved)
+        self.sweeps = 0
+        for _ in range(GIBBS_BURN_IN):
+            self.sweep()
+
+    def log_likelihood(self, node):
+        """Calculate the log probability of the Markov blanket of a node.
+
+        Arguments:
+            node (Node): The node.
+
+        Returns:
+            numpy.ndarray: The log probability of the node and its
+                children given their parents, for each chain.
+        """
+        with np.errstate(divide="ignore"):
+            result = np.log(self.probabilities(node, self.codes, GIBBS_CHAINS)[np.arange(GIBBS_CHAINS), self.codes[node]])
+            for child in node.children:
+                if child not in self.tables:
+                    continue
+                result += np.log(self.probabilities(child, self.codes, GIBBS_CHAINS)[np.arange(GIBBS_CHAINS), self.codes[child]])
+        return result
+
+    def sweep(self):
+        """Resample every unobserved node in every chain once."""
+        for node in self.unobserved:
+            current = self.codes[node]
+            log_probs = np.empty((GIBBS_CHAINS, len(node.values)))
+            for code in range(len(node.values)):
+                self.codes[node] = np.full(GIBBS_CHAINS, code)
+                log_probs[:, code] = self.log_likelihood(node)
+            largest = log_probs.max(axis=1)
+            # chains in impossible states keep their current value
+            stuck = largest == -np.inf
+            largest[stuck] = 0
+            probs = np.exp(log_probs - largest[:, None])
+            probs[stuck] = np.eye(len(node.values))[current[stuck]]
+            self.codes[node] = self.choose(probs)
+
+    def batch(self, size):
+        self.sweep()
+        self.sweeps += 1
+        for node, counts in self.counts.items():
+            counts[np.arange(GIBBS_CHAINS), self.codes[node]] += 1
+        return GIBBS_CHAINS
+
+    def estimate(self, num_samples):
+        with np.errstate(divide="ignore"):
+            log_probs = sum(
+                np.log(self.probabilities(node, self.codes, GIBBS_CHAINS)[np.arange(GIBBS_CHAINS), self.codes[node]])
+                for node in self.nodes
+            )
+        # chains that never left an impossible state are not counted
+        possible = log_probs > -np.inf
+        if not np.any(possible):
+            return None
+        posteriors = {}
+        errors = {}
+        for node, counts in self.counts.items():
+            frequencies = counts[possible] / self.sweeps
+            posteriors[node] = dict(zip(node.values, frequencies.mean(axis=0).tolist()))
+            # the chains are independent, unlike the samples within a chain
+            errors[node] = dict(zip(
+                node.values,
+                (frequencies.std(axis=0) / np.sqrt(len(frequencies))).tolist(),
+            ))
+        return Estimate(posteriors, errors, num_samples)
+
+
+SAMPLERS = {
+    "likelihood_weighting": LikelihoodWeighting,
+    "gibbs": GibbsSampler,
+}
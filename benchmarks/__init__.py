@@ -0,0 +1 @@
+"""Micro-benchmarks for the compute modules of the applets."""
@@ -0,0 +1,165 @@
+"""Canned and generated inputs of increasing size for the benchmarks."""
+
+from fractions import Fraction
+from itertools import product
+from random import Random
+from string import ascii_lowercase
+
+SEED = 8675309
+
+
+def variable_name(index):
+    # type: (int) -> str
+    """Create a lower-case-only variable name, as the liveness grammar requires."""
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, len(ascii_lowercase))
+        name = ascii_lowercase[remainder] + name
+    return name
+
+
+def bayes_chain(num_nodes):
+    # type: (int) -> str
+    """Create a chain-shaped Bayes network with the last node observed."""
+    lines = []
+    for index in range(1, num_nodes):
+        lines.append(f'n{index - 1} -> n{index}')
+    lines.append('')
+    lines.append('cpt for n0')
+    lines.append('t f')
+    lines.append('1/2 1/2')
+    for index in range(1, num_nodes):
+        lines.append('')
+        lines.append(f'cpt for n{index}')
+        lines.append(f'n{index - 1} t f')
+        lines.append('t 9/10 1/10')
+        lines.append('f 1/5 4/5')
+    lines.append('')
+    lines.append(f'observe n{num_nodes - 1} = t')
+    return '\n'.join(lines)
+
+
+def bayes_network(num_nodes, max_parents=2, num_values=2, topology='dense', num_observed=1, seed=SEED):
+    # type: (int, int, int, str, int, int) -> str
+    """Create a random Bayes network.
+
+    The topology is either 'chain', 'polytree' (a tree if edge directions are
+    ignored), or 'dense' (every node has max_parents parents among the
+    earlier nodes, if there are that many). The probabilities in each row of
+    a CPT are random fractions that sum to exactly 1. If no nodes are
+    observed, the network asks for a prediction instead.
+    """
+    rng = Random(seed)
+    parents = [[] for _ in range(num_nodes)] # type: List[List[int]]
+    for index in range(1, num_nodes):
+        if topology == 'chain':
+            parents[index].append(index - 1)
+        elif topology == 'polytree':
+            other = rng.randrange(index)
+            if rng.random() < 0.5 and len(parents[other]) < max_parents:
+                parents[other].append(index)
+            else:
+                parents[index].append(other)
+        elif topology == 'dense':
+            parents[index].extend(sorted(rng.sample(range(index), min(index, max_parents))))
+        else:
+            raise ValueError(f'unknown topology: {topology}')
+    values = [variable_name(index) for index in range(num_values)]
+    lines = []
+    for child, child_parents in enumerate(parents):
+        for parent in child_parents:
+            lines.append(f'n{parent} -> n{child}')
+    for child, child_parents in enumerate(parents):
+        lines.append('')
+        lines.append(f'cpt for n{child}')
+        lines.append(' '.join([f'n{parent}' for parent in child_parents] + values))
+        for key in product(values, repeat=len(child_parents)):
+            weights = [rng.randint(1, 9) for _ in values]
+            probs = [str(Fraction(weight, sum(weights))) for weight in weights]
+            lines.append(' '.join(list(key) + probs))
+    lines.append('')
+    for node in sorted(rng.sample(range(num_nodes), num_observed)):
+        lines.append(f'observe n{node} = {rng.choice(values)}')
+    if not num_observed:
+        lines.append('predict')
+    return '\n'.join(lines)
+
+
+def redistricting_grid(num_rows, num_cols, seed=SEED):
+    # type: (int, int, int) -> List[List[Dict[str, Any]]]
+    """Create the demographics of a redistricting map, as the web page does."""
+    rng = Random(seed)
+    rows = []
+    for _ in range(num_rows):
+        row = []
+        for _ in range(num_cols):
+            red_percent = rng.choice([rng.randrange(0, 50), rng.randrange(51, 100)])
+            races = [rng.randrange(1, 100) for _ in range(4)]
+            races = [round(100 * race / sum(races)) for race in races]
+            races[-1] += 100 - sum(races)
+            row.append({
+                'active': True,
+                'population': 1,
+                'parties': [red_percent, 100 - red_percent],
+                'races': races,
+            })
+        rows.append(row)
+    return rows
+
+
+def gerrymander_grid(num_rows, num_cols, seed=SEED):
+    # type: (int, int, int) -> str
+    """Create the grid of a dyna_prog State."""
+    rng = Random(seed)
+    return ''.join(rng.choice('BR') for _ in range(num_rows * num_cols))
+
+
+def liveness_program(num_statements, seed=SEED):
+    # type: (int, int) -> str
+    """Create a program with assignments, branches, and loops."""
+    rng = Random(seed)
+    variables = [variable_name(index) for index in range(max(2, num_statements // 4))]
+    lines = []
+    depth = 0
+    for index in range(num_statements):
+        target, *operands = rng.sample(variables, 3) if len(variables) >= 3 else variables * 2
+        choice = rng.random()
+        if depth < 3 and choice < 0.1:
+            lines.append(f'while ({operands[0]} < {operands[1]}) {{')
+            depth += 1
+        elif depth < 3 and choice < 0.2:
+            lines.append(f'if ({operands[0]} != {operands[1]}) {{')
+            depth += 1
+        elif depth and choice < 0.3:
+            # close blocks after a statement, since the grammar allows empty
+            # blocks but the analysis does not
+            lines.append(f'{target} += 1;')
+            lines.append('}')
+            depth -= 1
+        else:
+            lines.append(f'{target} = {operands[0]} + {operands[1]} * {index};')
+    while depth:
+        lines.append(f'{variables[0]} += 1;')
+        lines.append('}')
+        depth -= 1
+    return '\n'.join(lines)
+
+
+def memograph_heap(num_objects):
+    # type: (int) -> str
+    """Create a stack frame pointing to a linked list on the heap."""
+    lines = []
+    lines.append('stack {')
+    lines.append('    main() {')
+    lines.append('        Node head = node0;')
+    lines.append('    }')
+    lines.append('};')
+    for index in range(num_objects):
+        successor = f'node{index + 1}' if index + 1 < num_objects else 'null'
+        lines.append(f'Node node{index} = {{')
+        lines.append(f'    int value = {index};')
+        lines.append(f'    String name = "node {index}";')
+        lines.append(f'    Node next = {successor};')
+        lines.append('};')
+    return '\n'.join(lines)
@@ -0,0 +1,151 @@
+"""Replay recorded requests against a running app and report on them.
+
+The requests are read from a JSONL file written by appoxy.recorder, and
+sent at a fixed rate (or as fast as possible) by a number of concurrent
+clients. Throughput, latency percentiles, and error rates are reported
+for each endpoint.
+
+Usage:
+
+    python -m benchmarks.replay FILE [--url URL] [--concurrency N]
+        [--rate PER_SECOND] [--repeat N] [--no-cache] [--json]
+"""
+
+import json
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+Outcome = namedtuple('Outcome', 'endpoint, seconds, ok')
+
+
+def read_requests(path):
+    # type: (str) -> List[Dict[str, Any]]
+    """Read recorded requests, skipping lines that are not requests."""
+    requests = []
+    with open(path) as fd:
+        for line in fd:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if 'path' in record and 'body' in record:
+                requests.append(record)
+    return requests
+
+
+def send(base_url, record, no_cache, timeout):
+    # type: (str, Dict[str, Any], bool, float) -> Outcome
+    """Send a recorded request and time it."""
+    headers = {}
+    if record.get('content_type'):
+        headers['Content-Type'] = record['content_type']
+    if no_cache:
+        headers['Cache-Control'] = 'no-cache'
+    http_request = Request(
+        base_url.rstrip('/') + record['path'],
+        data=record['body'].encode('utf-8'),
+        headers=headers,
+        method=record.get('method', 'POST'),
+    )
+    start = perf_counter()
+    try:
+        with urlopen(http_request, timeout=timeout) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except HTTPError:
+        ok = False
+    except (URLError, OSError):
+        ok = False
+    return Outcome(record.get('endpoint', record['path']), perf_counter() - start, ok)
+
+
+def percentile(values, fraction):
+    # type: (Sequence[float], float) -> float
+    """Get a percentile of sorted values by the nearest-rank method."""
+    index = max(0, min(len(values) - 1, round(fraction * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def replay(records, base_url, concurrency, rate, no_cache, timeout):
+    # type: (Sequence[Dict[str, Any]], str, int, Optional[float], bool, float) -> Tuple[List[Outcome], float]
+    """Send the requests and collect the outcomes.
+
+    If a rate is given, request i is sent no earlier than i / rate seconds
+    after the start, regardless of how long earlier requests take.
+    """
+    start = perf_counter()
+
+    def scheduled_send(index, record):
+        if rate:
+            delay = start + index / rate - perf_counter()
+            if delay > 0:
+                sleep(delay)
+        return send(base_url, record, no_cache, timeout)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(scheduled_send, range(len(records)), records))
+    return outcomes, perf_counter() - start
+
+
+def summarize(outcomes, elapsed):
+    # type: (Sequence[Outcome], float) -> Dict[str, Dict[str, float]]
+    """Summarize the outcomes by endpoint."""
+    by_endpoint = defaultdict(list)
+    for outcome in outcomes:
+        by_endpoint[outcome.endpoint].append(outcome)
+        by_endpoint['(all)'].append(outcome)
+    summary = {}
+    for endpoint, endpoint_outcomes in sorted(by_endpoint.items()):
+        seconds = sorted(outcome.seconds for outcome in endpoint_outcomes)
+        errors = sum(1 for outcome in endpoint_outcomes if not outcome.ok)
+        summary[endpoint] = {
+            'requests': len(endpoint_outcomes),
+            'throughput': len(endpoint_outcomes) / elapsed if elapsed else 0,
+            'error_rate': errors / len(endpoint_outcomes),
+            'p50': percentile(seconds, 0.50),
+            'p90': percentile(seconds, 0.90),
+            'p99': percentile(seconds, 0.99),
+            'max': seconds[-1],
+        }
+    return summary
+
+
+def main():
+    # type: () -> None
+    """Replay requests from the command line."""
+    arg_parser = ArgumentParser(description='replay recorded requests against a running app')
+    arg_parser.add_argument('file', help='the JSONL file of recorded requests')
+    arg_parser.add_argument('--url', default='http://localhost:5000', help='the app to send requests to')
+    arg_parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients (default: 4)')
+    arg_parser.add_argument('--rate', type=float, help='requests per second (default: as fast as possible)')
+    arg_parser.add_argument('--repeat', type=int, default=1, help='times to replay the file (default: 1)')
+    arg_parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for a response')
+    arg_parser.add_argument('--no-cache', action='store_true', help='bypass the response cache')
+    arg_parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = arg_parser.parse_args()
+    records = read_requests(args.file) * args.repeat
+    if not records:
+        arg_parser.error(f'no recorded requests in {args.file}')
+    outcomes, elapsed = replay(records, args.url, args.concurrency, args.rate, args.no_cache, args.timeout)
+    summary = summarize(outcomes, elapsed)
+    if args.json:
+        print(json.dumps(summary, indent=4))
+        return
+    print(f'{len(outcomes)} requests in {elapsed:.2f}s', file=sys.stderr)
+    print('{:<32} {:>8} {:>8} {:>7} {:>8} {:>8} {:>8}'.format(
+        'endpoint', 'requests', 'req/s', 'errors', 'p50', 'p90', 'p99',
+    ))
+    for endpoint, stats in summary.items():
+        print('{:<32} {:>8} {:>8.2f} {:>6.1%} {:>7.3f}s {:>7.3f}s {:>7.3f}s'.format(
+            endpoint, stats['requests'], stats['throughput'], stats['error_rate'],
+            stats['p50'], stats['p90'], stats['p99'],
+        ))
+
+
+if __name__ == '__main__':
+    main()
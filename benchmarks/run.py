@@ -0,0 +1,292 @@
+"""Run the benchmarks and compare them against a baseline.
+
+Each benchmark is run at increasing sizes. For each size, the best time
+of several runs and the peak memory of one run are recorded; the scaling
+exponent is the slope of log(time) against log(size). Results are written
+as JSON, and any that are slower or larger than the baseline by more than
+the tolerance are flagged as regressions.
+
+Usage:
+
+    python -m benchmarks.run [--only NAME ...] [--output FILE]
+        [--baseline FILE] [--save-baseline] [--tolerance FRACTION]
+"""
+
+import json
+import math
+import platform
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from collections import namedtuple
+from pathlib import Path
+from time import perf_counter
+
+from .inputs import bayes_chain, bayes_network, gerrymander_grid, liveness_program, memograph_heap, redistricting_grid
+
+BASELINE_FILE = Path(__file__).parent / 'baseline.json'
+
+Benchmark = namedtuple('Benchmark', 'name, sizes, setup')
+
+BENCHMARKS = [] # type: List[Benchmark]
+
+
+def benchmark(name, sizes):
+    """Register a benchmark.
+
+    The decorated function takes a size and returns a function of no
+    arguments that does the work to be timed.
+
+    Parameters:
+        name (str): The name of the benchmark.
+        sizes (Sequence[int]): The sizes to run at, in increasing order.
+
+    Returns:
+        Callable[[Callable[[int], Callable[[], Any]]], Callable[[int], Callable[[], Any]]]:
+            The decorator.
+    """
+
+    def register(setup):
+        BENCHMARKS.append(Benchmark(name, tuple(sizes), setup))
+        return setup
+
+    return register
+
+
+@benchmark('bayes_parse_infer', (4, 6, 8, 10))
+def bayes_parse_infer(size):
+    # type: (int) -> Callable[[], Any]
+    """Parse a chain of nodes and infer every posterior."""
+    from bayes.bayesnet import BayesNet
+    text = bayes_chain(size)
+    return lambda: BayesNet(text)
+
+
+def bayes_inference(text):
+    # type: (str) -> Callable[[], Any]
+    """Parse a network once, then time inferring its posteriors from scratch."""
+    from bayes.bayesnet import BayesNet, CompiledNetwork
+    lines = text.splitlines()
+    observations = dict(line.split()[1::2] for line in lines if line.startswith('observe '))
+    net = BayesNet('\n'.join(line for line in lines if not line.startswith('observe ') and line != 'predict'))
+
+    def run():
+        # a new compiled network, so no junction tree or messages are reused
+        net.compiled = CompiledNetwork(net.nodes)
+        net.infer(observations)
+
+    return run
+
+
+@benchmark('bayes_parse', (250, 500, 1000, 2000))
+def bayes_parse(size):
+    # type: (int) -> Callable[[], Any]
+    """Parse a polytree of ternary nodes with up to three parents."""
+    from bayes.bayesnet import BayesNet
+    text = bayes_network(size, max_parents=3, num_values=3, topology='polytree', num_observed=0)
+    text = text.replace('predict', '')
+    return lambda: BayesNet(text)
+
+
+@benchmark('bayes_infer_chain', (50, 100, 200, 400))
+def bayes_infer_chain(size):
+    # type: (int) -> Callable[[], Any]
+    """Infer every posterior of a chain of binary nodes."""
+    return bayes_inference(bayes_network(size, topology='chain', num_observed=2))
+
+
+@benchmark('bayes_infer_polytree', (50, 100, 200, 400))
+def bayes_infer_polytree(size):
+    # type: (int) -> Callable[[], Any]
+    """Infer every posterior of a polytree of binary nodes with up to three parents."""
+    return bayes_inference(bayes_network(size, max_parents=3, topology='polytree', num_observed=2))
+
+
+@benchmark('bayes_infer_dense', (8, 12, 16, 20))
+def bayes_infer_dense(size):
+    # type: (int) -> Callable[[], Any]
+    """Infer every posterior of a DAG of binary nodes with three parents each."""
+    return bayes_inference(bayes_network(size, max_parents=3, topology='dense', num_observed=2))
+
+
+INFO_RET_TRANSFORMS = [
+    ['split', 'after', '". "'],
+    ['select', 'do not', 'contain', '"Credits"'],
+    ['replace', 'three-digits', '"###"'],
+    ['insert', 'before', 'dept-code', '"*"'],
+    ['delete', 'start', 'before', '"Prerequisite"'],
+]
+
+
+@benchmark('info_ret_pipeline', (5, 10, 21, 42))
+def info_ret_pipeline(size):
+    # type: (int) -> Callable[[], Any]
+    """Apply a pipeline of transforms to the catalog of some departments."""
+    from info_ret.info_ret import CODE2NAME, compile_pipeline, get_catalog
+    departments = sorted(CODE2NAME)[:size]
+
+    def run():
+        pipeline = compile_pipeline(INFO_RET_TRANSFORMS)
+        return [pipeline(description) for description in get_catalog(departments)]
+
+    return run
+
+
+@benchmark('solve_optimally', (4, 6, 8, 10))
+def solve_optimally(size):
+    # type: (int) -> Callable[[], Any]
+    """Find the optimal districts of two-column maps, two cells per district."""
+    from redistricting.redistricting import ObjectiveWalker, json_to_graph, solve_optimally as solve
+    num_districts = size // 2
+    graph = json_to_graph(redistricting_grid(size // 2, 2))
+    metric = ObjectiveWalker().parse(
+        f'Create {num_districts} districts while maximizing the number of districts'
+        ' that have more voters who vote Red than/as voters who vote Blue.'
+    )
+    return lambda: list(solve(graph, num_districts, metric))
+
+
+@benchmark('gerrymander', (8, 12, 16, 20, 24))
+def gerrymander(size):
+    # type: (int) -> Callable[[], Any]
+    """Gerrymander four-column states, four cells per district."""
+    from dyna_prog.dyna_prog import State, gerrymander as solve
+    num_rows = size // 4
+    state = State(num_rows, 4, gerrymander_grid(num_rows, 4))
+    return lambda: solve(state, num_rows, 4)
+
+
+@benchmark('liveness_reachability', (10, 20, 40, 80))
+def liveness_reachability(size):
+    # type: (int) -> Callable[[], Any]
+    """Compute reaching definitions of a generated program."""
+    from liveness.liveness import DataflowWalker, reachability
+    analysis = DataflowWalker().parse(liveness_program(size))
+    return lambda: reachability(analysis)
+
+
+@benchmark('liveness_liveness', (10, 20, 40, 80))
+def liveness_liveness(size):
+    # type: (int) -> Callable[[], Any]
+    """Compute live variables of a generated program."""
+    from liveness.liveness import DataflowWalker, liveness
+    analysis = DataflowWalker().parse(liveness_program(size))
+    return lambda: liveness(analysis)
+
+
+@benchmark('memograph_dot', (25, 50, 100, 200))
+def memograph_dot(size):
+    # type: (int) -> Callable[[], Any]
+    """Parse a linked list on the heap and draw it."""
+    from memograph.memograph import MemographWalker, memory_to_dot
+    text = memograph_heap(size)
+    return lambda: memory_to_dot(*MemographWalker().parse(text))
+
+
+def measure(function, repeat):
+    # type: (Callable[[], Any], int) -> Tuple[float, int]
+    """Get the best time and the peak memory of a function."""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def scaling_exponent(sizes, seconds):
+    # type: (Sequence[int], Sequence[float]) -> Optional[float]
+    """Fit the exponent k of time = c * size^k by least squares."""
+    points = [(math.log(size), math.log(time)) for size, time in zip(sizes, seconds) if time > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def run_benchmark(bench, repeat):
+    # type: (Benchmark, int) -> Dict[str, Any]
+    """Run a benchmark at all its sizes."""
+    result = {'sizes': [], 'seconds': [], 'peak_bytes': []}
+    for size in bench.sizes:
+        try:
+            function = bench.setup(size)
+        except ImportError as err:
+            print(f'{bench.name}: skipped ({err})', file=sys.stderr)
+            return {'skipped': str(err)}
+        seconds, peak = measure(function, repeat)
+        result['sizes'].append(size)
+        result['seconds'].append(seconds)
+        result['peak_bytes'].append(peak)
+        print(f'{bench.name} {size}: {seconds:.6f}s, {peak} bytes', file=sys.stderr)
+    result['exponent'] = scaling_exponent(result['sizes'], result['seconds'])
+    return result
+
+
+def compare(results, baseline, tolerance):
+    # type: (Dict[str, Any], Dict[str, Any], float) -> List[str]
+    """List the regressions of the results against the baseline."""
+    regressions = []
+    for name, result in sorted(results['benchmarks'].items()):
+        base = baseline['benchmarks'].get(name)
+        if 'skipped' in result or base is None or 'skipped' in base:
+            continue
+        base_by_size = dict(zip(base['sizes'], zip(base['seconds'], base['peak_bytes'])))
+        for size, seconds, peak in zip(result['sizes'], result['seconds'], result['peak_bytes']):
+            if size not in base_by_size:
+                continue
+            base_seconds, base_peak = base_by_size[size]
+            if seconds > base_seconds * (1 + tolerance):
+                regressions.append(f'{name} {size}: {seconds:.6f}s vs {base_seconds:.6f}s')
+            if peak > base_peak * (1 + tolerance):
+                regressions.append(f'{name} {size}: {peak} bytes vs {base_peak} bytes')
+    return regressions
+
+
+def main():
+    # type: () -> None
+    """Run the benchmarks from the command line."""
+    arg_parser = ArgumentParser(description='run the benchmarks of the compute modules')
+    arg_parser.add_argument('--only', nargs='+', metavar='NAME', help='only run these benchmarks')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='runs per size (default: 3)')
+    arg_parser.add_argument('--output', type=Path, help='write results to this file instead of stdout')
+    arg_parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help='the baseline to compare against')
+    arg_parser.add_argument('--save-baseline', action='store_true', help='save the results as the baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (default: 0.25)')
+    args = arg_parser.parse_args()
+    results = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'benchmarks': {},
+    }
+    for bench in BENCHMARKS:
+        if args.only and bench.name not in args.only:
+            continue
+        results['benchmarks'][bench.name] = run_benchmark(bench, args.repeat)
+    output = json.dumps(results, indent=4)
+    if args.output:
+        args.output.write_text(output + '\n')
+    else:
+        print(output)
+    if args.save_baseline:
+        args.baseline.write_text(output + '\n')
+    elif args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
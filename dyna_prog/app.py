@@ -1,9 +1,15 @@
 import json
 from os.path import basename, dirname, join as join_path
-from typing import Any, Tuple, List, Dict
+from typing import Any, Tuple, List, Dict, MutableMapping, Optional
 
 from flask import Blueprint, render_template, request
 
+from appoxy.admission import AdmissionPolicy, admit, partition_search_cost
+from appoxy.cache import cached
+from appoxy.jobs import add_job_routes
+from appoxy.metrics import span
+from appoxy.pool import JobTimeout, PoolBusy, solver_pool
+
 from .dyna_prog import Districts, State, Trace, gerrymander, state_as_districts
 
 APP_NAME = basename(dirname(__file__))
@@ -18,6 +24,8 @@ app = Blueprint(
 )
 
 
+ADMISSION_POLICY = AdmissionPolicy(queue_cost=1e5, degrade_cost=None, reject_cost=5e7)
+
 Coord = Tuple[int, int]
 CoordDistrict = Tuple[Coord, ...]
 CoordDistricts = Tuple[CoordDistrict, ...]
@@ -87,11 +95,8 @@ def to_jsonable(trace, trace_id='trace-0'):
     }
 
 
-@app.route('/solve', methods=['POST'])
-def solve():
-    # type: () -> str
-    data = json.loads(request.get_data())
-
+def solve_request(data, progress=None):
+    # type: (Dict[str, Any], Optional[MutableMapping[str, int]]) -> Dict[str, Any]
     demographics = data['demographics']
     num_rows = len(demographics)
     num_cols = len(demographics[0])
@@ -103,5 +108,32 @@ def solve():
     district_size = grid_size // num_districts
 
     state = State(num_rows, num_cols, grid)
-    trace = gerrymander(state, num_districts, district_size)
-    return json.dumps(to_jsonable(trace))
+    trace = gerrymander(state, num_districts, district_size, progress=progress)
+    return to_jsonable(trace)
+
+
+def estimate_cost(flask_request):
+    # type: (flask.Request) -> float
+    data = json.loads(flask_request.get_data())
+    grid = ''.join(''.join(row) for row in data['demographics'])
+    return partition_search_cost(sum(1 for char in grid if char in 'BR'), data['num_districts'])
+
+
+@app.route('/solve', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY)
+def solve():
+    # type: () -> str
+    data = json.loads(request.get_data())
+    try:
+        with span('gerrymander'):
+            result = solver_pool.run(solve_request, data)
+    except PoolBusy:
+        return 'The server is busy; please try again later.', 503
+    except JobTimeout:
+        return 'The solver took too long; please try a smaller map.', 504
+    with span('json_encoding'):
+        return json.dumps(result)
+
+
+add_job_routes(app, solve_request, estimate_cost, ADMISSION_POLICY)
@@ -1,6 +1,6 @@
 """A dynamic programming gerrymandering optimizer."""
 
-from typing import Any, Generator, Tuple, NamedTuple, List, Set, Dict
+from typing import Any, Generator, Tuple, NamedTuple, List, Set, Dict, MutableMapping, Optional
 
 District = Tuple[int, ...]
 Districts = Tuple[District, ...]
@@ -119,8 +119,11 @@ def state_as_districts(state):
     )
 
 
-def gerrymander(state, num_districts, district_size):
-    # type: (State, int) -> Trace
+def gerrymander(state, num_districts, district_size, progress=None):
+    # type: (State, int, int, Optional[MutableMapping[str, int]]) -> Trace
+
+    if progress is None:
+        progress = {'first_districts': 0, 'cache_size': 0, 'partitions': 0}
 
     def _gerrymander(state, district_size, cache, depth=0):
         # type: (State, int, Dict[CacheKey, CacheValue], int) -> Trace
@@ -132,6 +135,7 @@ def gerrymander(state, num_districts, district_size):
                 all_partitions.add(state_as_districts(state))
             else:
                 for first_district in all_first_districts(state, district_size):
+                    progress['first_districts'] += 1
                     next_state = remove_district(state, first_district)
                     if not is_connected(next_state):
                         continue
@@ -143,6 +147,7 @@ def gerrymander(state, num_districts, district_size):
                         sub_partitions.add(tuple(sorted((first_district, ) + sub_partition)))
                     calls.append(RecursiveCall(first_district, sub_trace, sub_partitions))
                     all_partitions |= sub_partitions
+                    progress['partitions'] += len(sub_partitions)
             best_partitions = []
             best_score = (-1, -1)
             for partition in all_partitions:
@@ -153,6 +158,7 @@ def gerrymander(state, num_districts, district_size):
                 elif score == best_score:
                     best_partitions.append(partition)
             cache[cache_key] = CacheValue(all_partitions, best_partitions)
+            progress['cache_size'] = len(cache)
         else:
             all_partitions, best_partitions = cache[cache_key]
         return Trace(depth, state, num_districts - depth, calls, all_partitions, best_partitions)
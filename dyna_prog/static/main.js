@@ -310,8 +310,8 @@ $(function () {
                 response = JSON.parse(response);
                 create_trace_list(response, $('#trace-list'));
             })
-            .fail(function () {
-                trace_list.html('Optimization failed (took too long)');
+            .fail(function (xhr) {
+                trace_list.html(xhr.responseText || 'Optimization failed (took too long)');
             });
     }
 
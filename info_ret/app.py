@@ -3,7 +3,7 @@ from os.path import basename, dirname, join as join_path
 
 from flask import Blueprint, render_template, request, jsonify
 
-from .info_ret import get_catalog, dispatch_transform
+from .info_ret import compile_pipeline, get_catalog
 
 APP_NAME = basename(dirname(__file__))
 
@@ -27,8 +27,6 @@ def process():
     json_data = json.loads(request.data.decode('utf-8'))
     transforms = json_data['transforms']
     departments = json_data['departments']
-    catalog = get_catalog(departments)
-    for transform in transforms:
-        catalog = [dispatch_transform(transform, description) for description in catalog]
-    result = list([old.text, new.text] for old, new in zip(get_catalog(departments), catalog))
+    pipeline = compile_pipeline(transforms)
+    result = list([old.text, pipeline(old).text] for old in get_catalog(departments))
     return jsonify({'data': result})
@@ -1,9 +1,12 @@
 """A web app for interactive GUI-based information extraction."""
 
 import re
-from functools import total_ordering
+from functools import lru_cache, partial, total_ordering
+from heapq import merge
 from itertools import compress
+from os import stat
 from os.path import dirname, join as join_path
+from threading import Lock
 
 CODE2NAME = {
     "AMST": "American Studies",
@@ -59,17 +62,28 @@ NAME2CODE = dict((text, code) for code, text in CODE2NAME.items())
 class CourseDescription:
     """A class to represent a course's catalog description
 
+    Descriptions are immutable, so that the catalog store can share them
+    between requests; transforms create new descriptions instead.
+
     Attributes:
         department (str): Course department as a short code.
         number (str): Course number as a string, since letters are allowed.
-        text (str): List of lines in the course description.
+        text (tuple): Tuple of lines in the course description.
 
     """
 
+    __slots__ = ('dept_code', 'number', 'text')
+
     def __init__(self, dept_code, number, text):
-        self.dept_code = dept_code
-        self.number = number
-        self.text = text
+        object.__setattr__(self, 'dept_code', dept_code)
+        object.__setattr__(self, 'number', number)
+        object.__setattr__(self, 'text', tuple(text))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CourseDescription is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CourseDescription is immutable")
 
     def __str__(self):
         return "{} {}".format(self.dept_code, self.number)
@@ -99,109 +113,138 @@ def run_insert_text(text, description):
         return None
 
 
-def run_text(text, description):
-    """Identifies the indices of matching text in the lines.
+TEXT_PATTERNS = {
+    'any-digit': re.compile('[0-9]+'),
+    'lower-case': re.compile('[a-z]+'),
+    'upper-case': re.compile('[A-Z]+'),
+    'three-digits': re.compile('[0-9]{3}'),
+}
+"""dict [str -> re.Pattern]: The compiled patterns of the character class specifiers."""
+
+
+def text_literal(text, dept_code):
+    """Find the literal text that a text specifier matches, if it has one.
 
     Arguments:
         text (str): The text to identify the index of.
-        description (CourseDescription): The course to be matched against.
+        dept_code (str): The department of the course to be matched against.
 
     Returns:
-        list: List of list of (start, end) index positions.
+        str: The literal, or None if the specifier is a character class.
     """
-    result = []
-    for line in description.text:
-        line_result = []
-        if text.startswith('"'):
-            index = line.find(text[1:-1])
-            while index != -1:
-                end = index + len(text) - 2
-                line_result.append([index, end])
-                index = line.find(text[1:-1], end)
-        elif text == 'any-digit':
-            for match in re.finditer('[0-9]+', line):
-                line_result.append([match.start(), match.end()])
-        elif text == 'lower-case':
-            for match in re.finditer('[a-z]+', line):
-                line_result.append([match.start(), match.end()])
-        elif text == 'upper-case':
-            for match in re.finditer('[A-Z]+', line):
-                line_result.append([match.start(), match.end()])
-        elif text == 'three-digits':
-            for match in re.finditer('[0-9]{3}', line):
-                line_result.append([match.start(), match.end()])
-        elif text == 'dept-code':
-            for match in re.finditer(description.dept_code, line):
-                line_result.append([match.start(), match.end()])
-        elif text == 'dept-name':
-            for match in re.finditer(CODE2NAME[description.dept_code], line):
-                line_result.append([match.start(), match.end()])
-        result.append(line_result)
-    return result
+    if text.startswith('"'):
+        return text[1:-1]
+    elif text == 'dept-code':
+        return dept_code
+    elif text == 'dept-name':
+        return CODE2NAME[dept_code]
+    else:
+        return None
 
 
-def run_location(tokens, description):
-    """Identifies the indices of matching text in the lines.
+@lru_cache(maxsize=256)
+def text_pattern(text, dept_code):
+    """Compile the pattern of a text specifier.
+
+    Arguments:
+        text (str): The text to identify the index of.
+        dept_code (str): The department of the course to be matched against.
+
+    Returns:
+        re.Pattern: The pattern, or None if the specifier is unknown.
+    """
+    literal = text_literal(text, dept_code)
+    if literal is None:
+        return TEXT_PATTERNS.get(text)
+    return re.compile(re.escape(literal))
+
+
+def find_text(text, lines, description):
+    """Identifies the indices of matching text in some lines of a course.
+
+    Arguments:
+        text (str): The text to identify the index of.
+        lines (sequence of str): The lines to search.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: List of list of (start, end) index positions.
+    """
+    pattern = text_pattern(text, description.dept_code)
+    if pattern is None:
+        return [[] for _ in lines]
+    finditer = pattern.finditer
+    line_index = catalog_store.line_index
+    candidates = line_index.candidates(text, description.dept_code)
+    if candidates is None:
+        return [[list(match.span()) for match in finditer(line)] for line in lines]
+    # skip the catalog lines that the index shows cannot match
+    indexed = line_index.lines
+    return [
+        [list(match.span()) for match in finditer(line)] if line in candidates or line not in indexed else []
+        for line in lines
+    ]
+
+
+def find_location(tokens, lines, description):
+    """Identifies the indices of matching text in some lines of a course.
 
     Arguments:
         tokens (list): A list of strings, serialized from the GUI.
-        description (CourseDescription): The course to be matched against.
+        lines (sequence of str): The lines to search.
+        description (CourseDescription): The course the lines are from.
 
     Returns:
         list: List of list of index positions.
     """
-    indices = run_text(tokens[1], description)
-    result = []
+    indices = find_text(tokens[1], lines, description)
     if tokens[0] == 'before':
-        for line_indices in indices:
-            result.append([start for start, end in line_indices])
+        return [[start for start, end in line_indices] for line_indices in indices]
     elif tokens[0] == 'after':
-        for line_indices in indices:
-            result.append([end for start, end in line_indices])
-    return result
+        return [[end for start, end in line_indices] for line_indices in indices]
+    return []
 
 
-def run_range(tokens, description):
-    """Identifies the indices of matching text in the lines.
-
-    The result is a list of pairs of indices that bracket the selected range.
+def find_range(tokens, lines, description):
+    """Identifies the ranges selected in some lines of a course.
 
     Arguments:
         tokens (list): A list of strings, serialized from the GUI.
-        description (CourseDescription): The course to be matched against.
+        lines (sequence of str): The lines to search.
+        description (CourseDescription): The course the lines are from.
 
     Returns:
         list: List of list of index positions.
     """
-    indices = run_location(tokens[1:], description)
+    indices = find_location(tokens[1:], lines, description)
     if tokens[0] == 'start':
-        return [[0, min(line_indices, default=len(line))] for line, line_indices in zip(description.text, indices)]
+        return [[0, min(line_indices, default=len(line))] for line, line_indices in zip(lines, indices)]
     elif tokens[0] == 'end':
-        return [[max(line_indices, default=0), len(line)] for line, line_indices in zip(description.text, indices)]
+        return [[max(line_indices, default=0), len(line)] for line, line_indices in zip(lines, indices)]
     else:
         assert False
         return None
 
 
-def run_filter(tokens, description):
-    """Identifies whether the lines contain the indicated text
+def filter_lines(tokens, lines, description):
+    """Identifies which lines of a course contain the indicated text.
 
     Arguments:
         tokens (list): A list of strings, serialized from the GUI.
-        description (CourseDescription): The course to be matched against.
+        lines (sequence of str): The lines to search.
+        description (CourseDescription): The course the lines are from.
 
     Returns:
-        list: List of list of index positions.
+        list: List of booleans, one per line.
     """
-    indices = run_text(tokens[-1], description)
+    indices = find_text(tokens[-1], lines, description)
     if tokens[1] == 'contain':
         indicator = [(True if line_indices else False) for line_indices in indices]
     elif tokens[1] == 'start with':
         indicator = [any(start == 0 for start, end in line_indices) for line_indices in indices]
     elif tokens[1] == 'end with':
         ends = [max((end for start, end in line_indices), default=-1) for line_indices in indices]
-        lengths = [len(text) for text in description.text]
-        indicator = [index == length for index, length in zip(ends, lengths)]
+        indicator = [index == len(line) for index, line in zip(ends, lines)]
     if tokens[0] == 'do':
         return indicator
     elif tokens[0] == 'do not':
@@ -211,6 +254,198 @@ def run_filter(tokens, description):
         return None
 
 
+def select_lines(tokens, lines, description):
+    """Select the lines of a course that match the filter.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        lines (sequence of str): The lines to transform.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: The selected lines.
+    """
+    return list(compress(lines, filter_lines(tokens[1:], lines, description)))
+
+
+def split_lines(tokens, lines, description):
+    """Splits the lines of a course at the designed location.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        lines (sequence of str): The lines to transform.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: The lines, split into multiple lines.
+    """
+    new_text = []
+    for line, line_indices in zip(lines, find_location(tokens[1:], lines, description)):
+        start = 0
+        for end in line_indices:
+            new_text.append(line[start:end])
+            start = end
+        new_text.append(line[start:])
+    return new_text
+
+
+def insert_lines(tokens, lines, description):
+    """Insert text into the lines of a course at the designed location.
+
+    As it always has, the inserted text takes the place of the character at
+    each location.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        lines (sequence of str): The lines to transform.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: The lines with the text inserted.
+    """
+    inserted_text = run_insert_text(tokens[-1], description)
+    new_text = []
+    for line, line_indices in zip(lines, find_location(tokens[1:-1], lines, description)):
+        if not line_indices:
+            new_text.append(line)
+            continue
+        # the locations are in increasing order, so the line is built in one pass
+        pieces = []
+        start = 0
+        for index in line_indices:
+            pieces.append(line[start:index])
+            pieces.append(inserted_text)
+            start = index + 1
+        pieces.append(line[start:])
+        new_text.append(''.join(pieces))
+    return new_text
+
+
+def delete_lines(tokens, lines, description):
+    """Delete text from each line of a course.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        lines (sequence of str): The lines to transform.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: The lines with the text deleted.
+    """
+    indices = find_range(tokens[1:], lines, description)
+    return [line[:start] + line[end:] for line, (start, end) in zip(lines, indices)]
+
+
+def replace_lines(tokens, lines, description):
+    """Replace text in each line of a course.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        lines (sequence of str): The lines to transform.
+        description (CourseDescription): The course the lines are from.
+
+    Returns:
+        list: The lines with the text replaced.
+    """
+    inserted_text = run_insert_text(tokens[2], description)
+    new_text = []
+    for line, line_indices in zip(lines, find_text(tokens[1], lines, description)):
+        if not line_indices:
+            new_text.append(line)
+            continue
+        # the matches do not overlap and are in order, so the line is built in one pass
+        pieces = []
+        start = 0
+        for match_start, match_end in line_indices:
+            pieces.append(line[start:match_start])
+            pieces.append(inserted_text)
+            start = match_end
+        pieces.append(line[start:])
+        new_text.append(''.join(pieces))
+    return new_text
+
+
+TRANSFORMS = {
+    'select': select_lines,
+    'split': split_lines,
+    'insert': insert_lines,
+    'delete': delete_lines,
+    'replace': replace_lines,
+}
+"""dict [str -> function]: The functions that transform the lines of a course, by transform name."""
+
+
+def run_text(text, description):
+    """Identifies the indices of matching text in the lines.
+
+    Arguments:
+        text (str): The text to identify the index of.
+        description (CourseDescription): The course to be matched against.
+
+    Returns:
+        list: List of list of (start, end) index positions.
+    """
+    return find_text(text, description.text, description)
+
+
+def run_location(tokens, description):
+    """Identifies the indices of matching text in the lines.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        description (CourseDescription): The course to be matched against.
+
+    Returns:
+        list: List of list of index positions.
+    """
+    return find_location(tokens, description.text, description)
+
+
+def run_range(tokens, description):
+    """Identifies the indices of matching text in the lines.
+
+    The result is a list of pairs of indices that bracket the selected range.
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        description (CourseDescription): The course to be matched against.
+
+    Returns:
+        list: List of list of index positions.
+    """
+    return find_range(tokens, description.text, description)
+
+
+def run_filter(tokens, description):
+    """Identifies whether the lines contain the indicated text
+
+    Arguments:
+        tokens (list): A list of strings, serialized from the GUI.
+        description (CourseDescription): The course to be matched against.
+
+    Returns:
+        list: List of list of index positions.
+    """
+    return filter_lines(tokens, description.text, description)
+
+
+def run_transform(transform, description):
+    """Apply a single transform to a course.
+
+    Arguments:
+        transform (list): A list of strings, serialized from the GUI.
+        description (CourseDescription): The course to be modified.
+
+    Returns:
+        CourseDescription: The transformed CourseDescription.
+    """
+    return CourseDescription(
+        description.dept_code,
+        description.number,
+        TRANSFORMS[transform[0]](transform, description.text, description),
+    )
+
+
 def run_select(tokens, description):
     """Select the lines that match the filter.
 
@@ -225,7 +460,7 @@ def run_select(tokens, description):
     return CourseDescription(
         description.dept_code,
         description.number,
-        list(compress(description.text, run_filter(tokens[1:], description))),
+        select_lines(tokens, description.text, description),
     )
 
 
@@ -240,16 +475,10 @@ def run_split(tokens, description):
         CourseDescription: A new CourseDescription with lines split into
             multiple lines in the text.
     """
-    indices = run_location(tokens[1:], description)
-    new_text = []
-    for line, line_indices in zip(description.text, indices):
-        line_indices = [0] + line_indices + [len(line)]
-        for start, end in zip(line_indices[:-1], line_indices[1:]):
-            new_text.append(line[start:end])
     return CourseDescription(
         description.dept_code,
         description.number,
-        new_text,
+        split_lines(tokens, description.text, description),
     )
 
 
@@ -264,18 +493,10 @@ def run_insert(tokens, description):
         CourseDescription: A new CourseDescription with additional text inserted
             into each line.
     """
-    indices = run_location(tokens[1:-1], description)
-    inserted_text = run_insert_text(tokens[-1], description)
-    new_text = []
-    for line, line_indices in zip(description.text, indices):
-        new_line = line
-        for index in sorted(line_indices, reverse=True):
-            new_line = new_line[:index] + inserted_text + new_line[index + 1:]
-        new_text.append(new_line)
     return CourseDescription(
         description.dept_code,
         description.number,
-        new_text,
+        insert_lines(tokens, description.text, description),
     )
 
 
@@ -290,11 +511,10 @@ def run_delete(tokens, description):
         CourseDescription: A new CourseDescription with text deleted from each
             line.
     """
-    indices = run_range(tokens[1:], description)
     return CourseDescription(
         description.dept_code,
         description.number,
-        [line[:start] + line[end:] for line, (start, end) in zip(description.text, indices)],
+        delete_lines(tokens, description.text, description),
     )
 
 
@@ -309,18 +529,10 @@ def run_replace(tokens, description):
         CourseDescription: A new CourseDescription with text deleted from each
             line.
     """
-    replaced_text = run_text(tokens[1], description)
-    inserted_text = run_insert_text(tokens[2], description)
-    new_text = []
-    for line, line_indices in zip(description.text, replaced_text):
-        new_line = line
-        for start, end in sorted(line_indices, reverse=True):
-            new_line = new_line[:start] + inserted_text + new_line[end:]
-        new_text.append(new_line)
     return CourseDescription(
         description.dept_code,
         description.number,
-        new_text,
+        replace_lines(tokens, description.text, description),
     )
 
 
@@ -334,23 +546,189 @@ def dispatch_transform(transform, description):
     Returns:
         CourseDescription: The transformed CourseDescription.
     """
-    if transform[0] == 'select':
-        return run_select(transform, description)
-    elif transform[0] == 'split':
-        return run_split(transform, description)
-    elif transform[0] == 'insert':
-        return run_insert(transform, description)
-    elif transform[0] == 'delete':
-        return run_delete(transform, description)
-    elif transform[0] == 'replace':
-        return run_replace(transform, description)
-    else:
+    if transform[0] not in TRANSFORMS:
         assert False
         return None
+    return run_transform(transform, description)
+
+
+def compile_pipeline(transforms):
+    """Fuse a list of transforms into a single function.
+
+    The lines of each course are passed from one transform to the next, so
+    no intermediate CourseDescriptions are created.
+
+    Arguments:
+        transforms (list): A list of transforms, serialized from the GUI.
+
+    Returns:
+        function: A function from a CourseDescription to the transformed
+            CourseDescription.
+    """
+    steps = []
+    for transform in transforms:
+        if transform[0] not in TRANSFORMS:
+            assert False
+            return None
+        steps.append(partial(TRANSFORMS[transform[0]], transform))
+
+    def pipeline(description):
+        lines = description.text
+        for step in steps:
+            lines = step(lines, description)
+        return CourseDescription(description.dept_code, description.number, lines)
+
+    return pipeline
+
+
+CATALOG_PATH = join_path(dirname(__file__), 'data', 'catalog.txt')
+"""str: The path of the catalog data file."""
+
+
+NGRAM_SIZE = 3
+"""int: The number of characters in each n-gram of the line index."""
+
+
+class LineIndex:
+    """Token and character n-gram postings over the catalog lines.
+
+    A line can only contain a literal if each whitespace-separated piece of
+    the literal is inside a token of the line, so run_text() can skip the
+    other lines of the catalog. The n-grams index the distinct tokens rather
+    than the lines, which keeps the index small enough to build with the
+    catalog. Lines that are not in the index, such as those created by
+    transforms, are always scanned.
+    """
+
+    def __init__(self, lines):
+        """Initialize the LineIndex.
+
+        Arguments:
+            lines (iterable of str): The lines of the catalog.
+        """
+        self.lines = frozenset(lines)
+        # the lines that contain each token, and the tokens that contain each n-gram
+        self.token_lines = {}
+        for line in self.lines:
+            for token in set(line.split()):
+                self.token_lines.setdefault(token, []).append(line)
+        self.ngram_tokens = {}
+        for token in self.token_lines:
+            for gram in {token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)}:
+                self.ngram_tokens.setdefault(gram, []).append(token)
+        # the lines that match each digit class; letters are on nearly every line
+        self.class_lines = dict(
+            (text, frozenset(line for line in self.lines if TEXT_PATTERNS[text].search(line)))
+            for text in ('any-digit', 'three-digits')
+        )
+        self.literal_candidates = lru_cache(maxsize=256)(self._literal_candidates)
+
+    def _literal_candidates(self, literal):
+        """Find the lines that may contain a literal.
+
+        Arguments:
+            literal (str): The literal text.
+
+        Returns:
+            frozenset of str: The lines, or None if the literal is only
+                whitespace.
+        """
+        candidates = None
+        for piece in set(literal.split()):
+            if len(piece) < NGRAM_SIZE:
+                tokens = self.token_lines
+            else:
+                tokens = min(
+                    (self.ngram_tokens.get(piece[i:i + NGRAM_SIZE], ()) for i in range(len(piece) - NGRAM_SIZE + 1)),
+                    key=len,
+                )
+            lines = set()
+            for token in tokens:
+                if piece in token:
+                    lines.update(self.token_lines[token])
+            candidates = lines if candidates is None else candidates & lines
+        return None if candidates is None else frozenset(candidates)
+
+    def candidates(self, text, dept_code):
+        """Find the lines that may match a text specifier.
+
+        Arguments:
+            text (str): The text to identify the index of.
+            dept_code (str): The department of the course to be matched against.
+
+        Returns:
+            frozenset of str: The indexed lines that may match, or None if
+                every line must be scanned.
+        """
+        literal = text_literal(text, dept_code)
+        if literal is None:
+            return self.class_lines.get(text)
+        return self.literal_candidates(literal)
+
+
+class CatalogStore:
+    """The catalog, loaded once per process and indexed by department.
+
+    The file is read again only if its modification time changes.
+    """
+
+    def __init__(self, path):
+        """Initialize the CatalogStore.
+
+        Arguments:
+            path (str): The path of the catalog data file.
+        """
+        self.path = path
+        self.mtime = None
+        # (position in the file, description) pairs, by department code
+        self.index = {}
+        self.line_index = LineIndex(())
+        self.lock = Lock()
+
+    def load(self):
+        """Read and index the catalog data file and its lines."""
+        index = {}
+        with open(self.path) as fd:
+            for position, description in enumerate(fd.read().strip().split('\n\n')):
+                lines = description.strip().splitlines()
+                dept_code, number, _ = lines[0].strip().split(' ', maxsplit=2)
+                index.setdefault(dept_code, []).append(
+                    (position, CourseDescription(dept_code, number, description.splitlines()))
+                )
+        self.line_index = LineIndex(
+            line for entries in index.values() for _, description in entries for line in description.text
+        )
+        self.index = dict((dept_code, tuple(entries)) for dept_code, entries in index.items())
+
+    def get(self, departments):
+        """Get the descriptions of some departments.
+
+        Arguments:
+            departments (list): A list of strings, indicating the departments
+                to be included in the result.
+
+        Returns:
+            list of CourseDescription: The descriptions, in catalog order.
+        """
+        mtime = stat(self.path).st_mtime
+        if mtime != self.mtime:
+            with self.lock:
+                if mtime != self.mtime:
+                    self.load()
+                    self.mtime = mtime
+        index = self.index
+        return [
+            description for _, description
+            in merge(*(index.get(dept_code, ()) for dept_code in set(departments)))
+        ]
+
+
+catalog_store = CatalogStore(CATALOG_PATH)
+"""CatalogStore: The catalog shared by all requests."""
 
 
 def get_catalog(departments):
-    """Read the catalog data file.
+    """Get the catalog descriptions of some departments.
 
     Arguments:
         departments (list): A list of strings, indicating the departments to be
@@ -359,11 +737,4 @@ def get_catalog(departments):
     Returns:
         list of CourseDescription
     """
-    catalog = []
-    with open(join_path(dirname(__file__), 'data', 'catalog.txt')) as fd:
-        for description in fd.read().strip().split('\n\n'):
-            lines = description.strip().splitlines()
-            dept_code, number, _ = lines[0].strip().split(' ', maxsplit=2)
-            if dept_code in departments:
-                catalog.append(CourseDescription(dept_code, number, description.splitlines()))
-    return catalog
+    return catalog_store.get(departments)
@@ -3,6 +3,10 @@ from os.path import basename, dirname, join as join_path
 
 from flask import Blueprint, request, render_template
 
+from appoxy.admission import AdmissionPolicy, admit
+from appoxy.cache import cached
+from appoxy.metrics import span
+
 from .liveness import control_flow_graph, DataflowWalker, upwards_exposure, local_definitions, available_definitions, reachability, liveness as calculate_liveness
 
 APP_NAME = basename(dirname(__file__))
@@ -18,23 +22,34 @@ app = Blueprint(
 
 LocalInfo = namedtuple('LocalInfo', ['exposed', 'defined', 'available'])
 
+ADMISSION_POLICY = AdmissionPolicy(queue_cost=200, degrade_cost=None, reject_cost=2000)
+
 
 @app.route('/')
 def root():
     return render_template(join_path(APP_NAME, 'index.html'))
 
 
+def estimate_cost(flask_request):
+    return flask_request.get_data(as_text=True).strip().count('\n') + 1
+
+
 @app.route('/cfg', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY, rejected=(lambda message: message))
 def draw_cfg():
     source = request.get_data(as_text=True)
     try:
         analysis = DataflowWalker().parse(source)
-        return control_flow_graph(analysis)
+        with span('dot'):
+            return control_flow_graph(analysis)
     except SyntaxError:
         return 'Syntax Error'
 
 
 @app.route('/usage', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY, rejected=(lambda message: f'<p class="center">{message}</p>'))
 def generate_usage():
     source = request.get_data(as_text=True).rstrip()
     try:
@@ -48,6 +63,8 @@ def generate_usage():
 
 
 @app.route('/reachability', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY, rejected=(lambda message: f'<p class="center">{message}</p>'))
 def generate_reachability():
     source = request.get_data(as_text=True).rstrip()
     try:
@@ -65,6 +82,8 @@ def generate_reachability():
 
 
 @app.route('/liveness', methods=['POST'])
+@cached
+@admit(estimate_cost, ADMISSION_POLICY, rejected=(lambda message: f'<p class="center">{message}</p>'))
 def generate_liveness():
     source = request.get_data(as_text=True).rstrip()
     try:
@@ -4,7 +4,7 @@ from collections import namedtuple, defaultdict
 from os.path import join as join_path, dirname, abspath
 from copy import deepcopy
 
-from pegparse import create_parser_from_file, ASTWalker
+from appoxy.grammars import GrammarWalker
 
 EBNF_FILE = join_path(dirname(abspath(__file__)), 'c-like.ebnf')
 
@@ -26,10 +26,10 @@ class LineOfCode:
         return '{}_{}_{}'.format(self.var, self.line_num, self.column)
 
 
-class DataflowWalker(ASTWalker):
+class DataflowWalker(GrammarWalker):
 
     def __init__(self):
-        super().__init__(create_parser_from_file(EBNF_FILE), 'Program')
+        super().__init__(EBNF_FILE, 'Program')
         self._reset()
 
     def _reset(self):
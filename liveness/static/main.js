@@ -42,7 +42,7 @@ $(function () {
         $liveness.empty();
         // display control flow graph
         $.post("/liveness/cfg", $src.val()).done(function(response) {
-            if (response === "Syntax Error") {
+            if (response.indexOf("digraph") !== 0) {
                 $cfg.append(response);
             } else {
                 $cfg.append(Viz(response));
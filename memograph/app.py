@@ -2,6 +2,9 @@ from os.path import basename, dirname, join as join_path
 
 from flask import Blueprint, render_template, request, redirect, url_for
 
+from appoxy.cache import cached
+from appoxy.metrics import span
+
 from .memograph import MemographWalker, memory_to_dot
 
 APP_NAME = basename(dirname(__file__))
@@ -31,10 +34,13 @@ def syntax():
 
 
 @app.route('/parse', methods=['POST'])
+@cached
 def parse():
     text = request.get_data(as_text=True)
     try:
         mem_parser = MemographWalker()
-        return memory_to_dot(*mem_parser.parse(text))
+        memory = mem_parser.parse(text)
+        with span('dot'):
+            return memory_to_dot(*memory)
     except (KeyError, ValueError, SyntaxError) as err:
         return 'ERROR ' + str(err)
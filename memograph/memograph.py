@@ -6,8 +6,7 @@ from pathlib import Path
 from textwrap import indent
 from typing import Any, Optional, Sequence, Mapping, Tuple, List, Dict
 
-# pylint: disable = no-name-in-module
-from pegparse import create_parser_from_file, ASTWalker
+from appoxy.grammars import GrammarWalker
 
 ID_GENERATOR = count()
 
@@ -109,16 +108,13 @@ class TypedValue:
         return self.type in ('char', 'int', 'boolean')
 
 
-class MemographWalker(ASTWalker): # type: ignore
+class MemographWalker(GrammarWalker):
     """A Java-like structure parser."""
 
     def __init__(self):
         # type: () -> None
         """Initialize the MemographWalker."""
-        super().__init__(
-            create_parser_from_file(Path(__file__).parent / 'memograph.ebnf'),
-            'Memory',
-        )
+        super().__init__(Path(__file__).parent / 'memograph.ebnf', 'Memory')
         self.stack = [] # type: List[StackFrame]
         self.heap = {} # type: Dict[str, TypedValue]
 
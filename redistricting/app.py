@@ -1,9 +1,13 @@
 import json
 from os.path import basename, dirname, join as join_path
-from time import time
 
 from flask import Blueprint, render_template, request
 
+from appoxy.admission import AdmissionPolicy, admit, partition_search_cost
+from appoxy.jobs import add_job_routes
+from appoxy.metrics import span
+from appoxy.pool import JobTimeout, PoolBusy, solver_pool
+
 from .redistricting import json_to_graph, Cell, ObjectiveWalker, solve_optimally, create_district_map
 
 APP_NAME = basename(dirname(__file__))
@@ -18,14 +22,15 @@ app = Blueprint(
 )
 
 
+ADMISSION_POLICY = AdmissionPolicy(queue_cost=1e5, degrade_cost=None, reject_cost=5e7)
+
+
 @app.route('/')
 def root():
     return render_template(join_path(APP_NAME, 'index.html'))
 
 
-@app.route('/solve', methods=['POST'])
-def solve():
-    data = json.loads(request.get_data())
+def solve_request(data, progress=None):
     graph = json_to_graph(data['demographics'])
     if not data['use_demographics']:
         defaults = {
@@ -46,8 +51,7 @@ def solve():
     num_districts = data['num_districts']
     metric = ObjectiveWalker().parse(data['objective'])
     result = []
-    start = time()
-    for partition in solve_optimally(graph, num_districts, metric):
+    for partition in solve_optimally(graph, num_districts, metric, progress=progress):
         districts = create_district_map(partition)
         borders = []
         for row in range(num_rows):
@@ -62,5 +66,31 @@ def solve():
             'districts': partition,
             'borders': borders,
         })
-    print(f'solved {num_rows}x{num_cols} {time() - start}')
-    return json.dumps(result)
+    return result
+
+
+def estimate_cost(flask_request):
+    data = json.loads(flask_request.get_data())
+    num_cells = sum(1 for row in data['demographics'] for cell in row if cell != {})
+    return partition_search_cost(num_cells, data['num_districts'])
+
+
+@app.route('/solve', methods=['POST'])
+@admit(estimate_cost, ADMISSION_POLICY)
+def solve():
+    data = json.loads(request.get_data())
+    # parse here too, so the parse is checked and counted in this process's
+    # metrics before a worker is taken; the parsed objective cannot be pickled
+    ObjectiveWalker().parse(data['objective'])
+    try:
+        with span('solve_optimally'):
+            result = solver_pool.run(solve_request, data)
+    except PoolBusy:
+        return 'The server is busy; please try again later.', 503
+    except JobTimeout:
+        return 'The solver took too long; please try a smaller map.', 504
+    with span('json_encoding'):
+        return json.dumps(result)
+
+
+add_job_routes(app, solve_request, estimate_cost, ADMISSION_POLICY)
@@ -7,7 +7,7 @@ from pathlib import Path
 
 import networkx as nx
 
-from pegparse import create_parser_from_file, ASTWalker
+from appoxy.grammars import GrammarWalker
 
 EBNF_FILE = Path(__file__).parent.joinpath('objective.ebnf')
 
@@ -178,7 +178,7 @@ def all_first_districts(graph, population, num_districts):
 SubSolution = namedtuple('SubSolution', 'score, partitions')
 
 
-def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None):
+def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None, progress=None):
     """Find the partition that maximizes the evaluation function.
 
     Parameters:
@@ -189,6 +189,9 @@ def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None
         population (int): The total population of the map.
         cache (Mapping[ Tuple[str, Tuple[int]], SubSolution ]):
             A cache of the optimal subsolutions.
+        progress (MutableMapping[str, int]): Counters of first districts
+            tried, cache size, and partitions found, updated during the
+            search.
 
     Yields:
         Tuple[ Tuple[ Tuple[int, int] ] ]:
@@ -199,6 +202,8 @@ def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None
         return
     if cache is None:
         cache = {}
+    if progress is None:
+        progress = {'first_districts': 0, 'cache_size': 0, 'partitions': 0}
     cache_key = (graph_to_json(graph), num_districts)
     if cache_key in cache:
         yield from cache[cache_key].partitions
@@ -211,6 +216,7 @@ def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None
     partitions = set()
     first_districts = all_first_districts(graph, population, num_districts)
     for district, district_population in first_districts:
+        progress['first_districts'] += 1
         sub_graph = json_to_graph(json.loads(graph_to_json(graph, exclusions=district)))
         if sub_graph and not nx.is_connected(sub_graph):
             continue
@@ -220,9 +226,11 @@ def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None
             metric_fn,
             population - district_population,
             cache=cache,
+            progress=progress,
         )
         for sub_partition in sub_partitions:
             partitions.add(tuple(sorted((district, ) + sub_partition)))
+            progress['partitions'] += 1
     if not partitions:
         return
     for partition in partitions:
@@ -232,14 +240,15 @@ def solve_optimally(graph, num_districts, metric_fn, population=None, cache=None
             cache[cache_key] = SubSolution(score, set([partition]))
         elif score == cache[cache_key].score:
             cache[cache_key].partitions.add(partition)
+    progress['cache_size'] = len(cache)
     yield from cache[cache_key].partitions
 
 
-class ObjectiveWalker(ASTWalker):
+class ObjectiveWalker(GrammarWalker):
     # pylint: disable = bad-continuation, invalid-name, unused-argument, no-self-use
 
     def __init__(self):
-        super().__init__(create_parser_from_file(str(EBNF_FILE)), 'Objective')
+        super().__init__(EBNF_FILE, 'Objective')
 
     def _parse_Objective(self, ast, results):
         return (lambda partition, graph, districts:
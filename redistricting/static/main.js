@@ -394,8 +394,8 @@ $(function () {
                 SOLUTIONS = JSON.parse(response);
                 create_solutions_table()
             })
-            .fail(function () {
-                $('#solutions').html('Optimization failed (took too long)');
+            .fail(function (xhr) {
+                $('#solutions').html(xhr.responseText || 'Optimization failed (took too long)');
             });
     }
 
@@ -0,0 +1,19 @@
+import os
+import sys
+from pathlib import Path
+from tempfile import mkdtemp
+
+import pytest
+
+# import applets on demand, so that tests of one applet do not need the
+# dependencies of all of them
+os.environ.setdefault('APPOXY_LAZY_APPLETS', '1')
+os.environ.setdefault('APPOXY_JOB_DB', os.path.join(mkdtemp(), 'jobs.sqlite3'))
+os.environ.setdefault('APPOXY_RESPONSE_CACHE_BYTES', '0')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
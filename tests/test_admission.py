@@ -0,0 +1,19 @@
+import json
+import math
+
+from appoxy.admission import format_cost, partition_search_cost
+
+
+def test_format_cost():
+    assert format_cost(5e7) == '5e+07'
+    assert format_cost(12) == '12'
+    assert format_cost(math.comb(1600, 800) * 2) == '1.77e+480'
+    assert format_cost(10 ** 400 - 1) == '1e+400'
+
+
+def test_reject_huge_grid(client):
+    data = {'demographics': [['B'] * 40 for _ in range(40)], 'num_districts': 2}
+    assert partition_search_cost(1600, 2) > 1e308
+    response = client.post('/dyna_prog/solve', data=json.dumps(data))
+    assert response.status_code == 413
+    assert 'estimated cost 1.77e+480' in response.get_data(as_text=True)
@@ -0,0 +1,14 @@
+from appoxy.assets import Assets, build
+
+
+def test_stale_entries_are_skipped(tmp_path):
+    (tmp_path / 'static').mkdir()
+    (tmp_path / 'static' / 'fresh.js').write_text('var fresh = 1;')
+    (tmp_path / 'static' / 'stale.js').write_text('var stale = 1;')
+    build_dir = tmp_path / 'build' / 'static'
+    build(tmp_path, build_dir)
+    (tmp_path / 'static' / 'stale.js').write_text('var stale = 2;')
+    assets = Assets(build_dir / 'manifest.json', tmp_path)
+    assert list(assets.manifest) == ['static/fresh.js']
+    assert assets.stale == ['static/stale.js']
+    assert list(assets.hashed.values()) == ['static/fresh.js']
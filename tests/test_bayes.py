@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+NETWORK = '''
+rain -> wet
+
+cpt for rain
+yes no
+1/5 4/5
+
+cpt for wet
+rain yes no
+yes 9/10 1/10
+no 1/10 9/10
+'''
+
+
+def query(client, **fields):
+    return client.post('/bayes/query', data=json.dumps({'network': NETWORK, **fields}))
+
+
+def test_query(client):
+    response = query(client, scenarios=[{}, {'wet': 'yes'}], targets=['rain'])
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results[0]['posteriors']['rain']['yes'] == pytest.approx(0.2)
+    assert results[1]['posteriors']['rain']['yes'] == pytest.approx(0.18 / 0.26)
+
+
+@pytest.mark.parametrize('fields', [
+    {'seed': 'x', 'method': 'likelihood_weighting'},
+    {'seed': 1.5},
+    {'scenarios': {'wet': 'yes'}},
+    {'scenarios': ['wet']},
+    {'scenarios': [{'wet': ['yes']}]},
+    {'targets': 'rain'},
+    {'targets': [['rain']]},
+    {'method': ['gibbs']},
+    {'precision': ['log']},
+    {'network': None},
+])
+def test_invalid_query(client, fields):
+    response = query(client, **fields)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Error: ')
+
+
+@pytest.mark.parametrize('body', ['not json', b'\xff', ''])
+def test_query_not_json(client, body):
+    response = client.post('/bayes/query', data=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Error: ')
+
+
+@pytest.mark.parametrize('method', ['likelihood_weighting', 'gibbs'])
+def test_sampled_query(client, method):
+    response = query(client, scenarios=[{'wet': 'yes'}], targets=['rain'], method=method, seed=0)
+    assert response.status_code == 200
+    result = response.get_json()['results'][0]
+    assert result['posteriors']['rain']['yes'] == pytest.approx(0.18 / 0.26, abs=5 * result['errors']['rain']['yes'])
+
+
+@pytest.mark.parametrize('seed, status', [('3', 200), ('abc', 400), ('1.5', 400), ('', 400)])
+def test_parse_seed(client, seed, status):
+    response = client.post('/bayes/parse?method=likelihood_weighting&seed=' + seed, data=NETWORK + '\npredict\n')
+    assert response.status_code == status
+
+
+def test_stats_after_cached_parse(client):
+    network = NETWORK + '\nobserve wet = yes\n'
+    first = client.post('/bayes/parse?stats', data=network).get_json()['stats']
+    client.post('/bayes/parse', data=network)
+    second = client.post('/bayes/parse?stats', data=network).get_json()['stats']
+    assert first['multiplications'] > 0
+    for stat in ('relevant_nodes', 'largest_factor', 'multiplications'):
+        assert second[stat] == first[stat]
+    assert second['relevant_nodes'] == 2
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('pegparse')
+
+from appoxy.grammars import get_parser # pylint: disable = wrong-import-position
+from benchmarks.inputs import liveness_program # pylint: disable = wrong-import-position
+from liveness.liveness import EBNF_FILE, DataflowWalker # pylint: disable = wrong-import-position
+
+
+def summarize(analysis):
+    return (
+        sorted(tuple(edge) for edge in analysis.edges),
+        sorted((line_num, line.source) for line_num, line in analysis.lines.items()),
+    )
+
+
+def parse(size):
+    return summarize(DataflowWalker().parse(liveness_program(size)))
+
+
+def test_parsers_are_per_thread():
+    assert get_parser(EBNF_FILE) is get_parser(EBNF_FILE)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(get_parser, EBNF_FILE).result() is not get_parser(EBNF_FILE)
+
+
+def test_concurrent_parses():
+    sizes = [5, 10, 20, 40] * 8
+    expected = [parse(size) for size in sizes]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(parse, sizes)) == expected
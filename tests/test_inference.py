@@ -0,0 +1,99 @@
+from fractions import Fraction
+
+import pytest
+
+from bayes.bayesnet import BayesNet
+from bayes.inference import JunctionTree
+from benchmarks.inputs import bayes_network
+
+DISCONNECTED = '''
+a -> b
+c -> d
+
+cpt for a
+yes no
+1/3 2/3
+
+cpt for b
+a yes no
+yes 1/2 1/2
+no 1/4 3/4
+
+cpt for c
+yes no
+1/5 4/5
+
+cpt for d
+c yes no
+yes 1/2 1/2
+no 1/2 1/2
+
+observe b = yes
+'''
+
+
+@pytest.mark.parametrize('text', [
+    bayes_network(40, 2, 2, 'polytree', 0, seed=1),
+    bayes_network(20, 3, 2, 'dense', 0, seed=2),
+    DISCONNECTED,
+])
+def test_junction_tree_structure(text):
+    nodes = BayesNet(text, method='elimination').nodes.values()
+    tree = JunctionTree(nodes)
+    assert len(tree.edges) == len(tree.cliques) - 1
+    # no clique is inside another, and the cliques with each node are connected
+    cliques = [set(clique) for clique in tree.cliques]
+    assert not any(first < second for first in cliques for second in cliques)
+    assert sorted(node.name for assigned in tree.assigned for node in assigned) == sorted(node.name for node in nodes)
+    for index, assigned in enumerate(tree.assigned):
+        assert all(set((*node.parents, node)) <= cliques[index] for node in assigned)
+    for node in nodes:
+        containing = set(index for index, clique in enumerate(cliques) if node in clique)
+        assert tree.home[node] in containing
+        edges = [(parent, child) for parent, child in tree.edges if parent in containing and child in containing]
+        assert len(edges) == len(containing) - 1
+
+
+def test_disconnected_network():
+    net = BayesNet(DISCONNECTED)
+    assert net.error is None
+    assert net.posteriors['a'] == {'yes': Fraction(1, 2), 'no': Fraction(1, 2)}
+    assert net.posteriors['c'] == {'yes': Fraction(1, 5), 'no': Fraction(4, 5)}
+
+
+# (number of nodes, parents, values, topology, observed nodes)
+SMALL_NETWORKS = [
+    (6, 1, 2, 'chain', 0),
+    (6, 1, 2, 'chain', 2),
+    (7, 2, 2, 'polytree', 0),
+    (7, 2, 3, 'polytree', 2),
+    (6, 2, 2, 'dense', 0),
+    (6, 2, 3, 'dense', 1),
+    (7, 3, 2, 'dense', 2),
+]
+
+
+@pytest.mark.parametrize('network', SMALL_NETWORKS)
+@pytest.mark.parametrize('method', ['junction_tree', 'elimination'])
+@pytest.mark.parametrize('ordering', ['min_fill', 'min_degree'])
+def test_exact_methods_match_enumeration(network, method, ordering):
+    text = bayes_network(*network)
+    expected = BayesNet(text, method='enumeration')
+    net = BayesNet(text, method=method, ordering=ordering)
+    assert expected.error is None and net.error is None
+    assert net.posteriors == expected.posteriors
+    assert not any(isinstance(prob, float) for posterior in net.posteriors.values() for prob in posterior.values())
+
+
+@pytest.mark.parametrize('network', SMALL_NETWORKS)
+@pytest.mark.parametrize('method', ['junction_tree', 'elimination'])
+@pytest.mark.parametrize('precision', ['float', 'log'])
+def test_float_precisions_match_enumeration(network, method, precision):
+    pytest.importorskip('numpy')
+    text = bayes_network(*network)
+    expected = BayesNet(text, method='enumeration')
+    net = BayesNet(text, method=method, precision=precision)
+    assert net.error is None
+    assert net.posteriors.keys() == expected.posteriors.keys()
+    for name, posterior in expected.posteriors.items():
+        assert net.posteriors[name] == pytest.approx({value: float(prob) for value, prob in posterior.items()})
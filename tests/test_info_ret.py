@@ -0,0 +1,142 @@
+import re
+from itertools import compress
+from random import Random
+
+import pytest
+
+from info_ret.info_ret import (
+    CODE2NAME, TEXT_PATTERNS, catalog_store, compile_pipeline, dispatch_transform, find_text, get_catalog,
+    run_delete, run_insert, run_replace, run_select, run_split,
+)
+
+TEXTS = [
+    '"the"', '"Prerequisite"', '"."', '". "', '"COMP"', '"xyz"', '"Credits"',
+    'any-digit', 'three-digits', 'lower-case', 'upper-case', 'dept-code', 'dept-name',
+]
+INSERTED_TEXTS = ['"*"', '"##"', 'dept-code', 'dept-name']
+RUN_TRANSFORMS = {
+    'select': run_select,
+    'split': run_split,
+    'insert': run_insert,
+    'delete': run_delete,
+    'replace': run_replace,
+}
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return get_catalog(list(CODE2NAME))
+
+
+def test_line_index_candidates(catalog):
+    lines = sorted(set(line for description in catalog for line in description.text))
+    line_index = catalog_store.line_index
+    rng = Random(0)
+    literals = ['', ' ', 'Prerequisite', 'zzq', 'e 1', 'Credits: ', 'COMP 229']
+    for _ in range(200):
+        line = rng.choice(lines)
+        start = rng.randrange(len(line))
+        literals.append(line[start:start + rng.randint(1, 20)])
+    for literal in literals:
+        candidates = line_index.candidates('"{}"'.format(literal), 'COMP')
+        if candidates is not None:
+            assert set(line for line in lines if literal in line) <= candidates
+    for text in TEXT_PATTERNS:
+        candidates = line_index.candidates(text, 'COMP')
+        if candidates is not None:
+            assert set(line for line in lines if TEXT_PATTERNS[text].search(line)) <= candidates
+
+
+def test_unindexed_lines_are_scanned(catalog):
+    description = catalog[0]
+    # lines made by transforms are not in the index
+    lines = ('zzq ' + description.text[0], '101 zzq')
+    assert find_text('"zzq"', lines, description) == [[[0, 3]], [[4, 7]]]
+    assert find_text('three-digits', lines, description)[1] == [[0, 3]]
+
+
+def random_transform(rng):
+    kind = rng.choice(['select', 'split', 'insert', 'delete', 'replace'])
+    location = [rng.choice(['before', 'after']), rng.choice(TEXTS)]
+    if kind == 'select':
+        return ['select', rng.choice(['do', 'do not']), rng.choice(['contain', 'start with', 'end with']), rng.choice(TEXTS)]
+    elif kind == 'split':
+        return ['split', *location]
+    elif kind == 'insert':
+        return ['insert', *location, rng.choice(INSERTED_TEXTS)]
+    elif kind == 'delete':
+        return ['delete', rng.choice(['start', 'end']), *location]
+    return ['replace', rng.choice(TEXTS), rng.choice(INSERTED_TEXTS)]
+
+
+def reference_text(text, dept_code):
+    if text.startswith('"'):
+        return text[1:-1]
+    return dept_code if text == 'dept-code' else CODE2NAME[dept_code]
+
+
+def reference_matches(text, line, dept_code):
+    if text in TEXT_PATTERNS:
+        pattern = TEXT_PATTERNS[text].pattern
+    else:
+        pattern = re.escape(reference_text(text, dept_code))
+    return [(match.start(), match.end()) for match in re.finditer(pattern, line)]
+
+
+def reference_locations(tokens, line, dept_code):
+    return [match[tokens[0] == 'after'] for match in reference_matches(tokens[1], line, dept_code)]
+
+
+def reference_transform(transform, lines, dept_code):
+    """Apply a transform by slicing once per match, as the transforms did before they were fused."""
+    kind = transform[0]
+    result = []
+    if kind == 'select':
+        _, negate, condition, text = transform
+        for line in lines:
+            matches = reference_matches(text, line, dept_code)
+            if condition == 'contain':
+                found = bool(matches)
+            elif condition == 'start with':
+                found = any(start == 0 for start, _ in matches)
+            else:
+                found = max((end for _, end in matches), default=-1) == len(line)
+            result.append(found != (negate == 'do not'))
+        return list(compress(lines, result))
+    for line in lines:
+        if kind == 'split':
+            indices = [0] + reference_locations(transform[1:], line, dept_code) + [len(line)]
+            result.extend(line[start:end] for start, end in zip(indices[:-1], indices[1:]))
+        elif kind == 'insert':
+            for index in sorted(reference_locations(transform[1:3], line, dept_code), reverse=True):
+                line = line[:index] + reference_text(transform[3], dept_code) + line[index + 1:]
+            result.append(line)
+        elif kind == 'delete':
+            indices = reference_locations(transform[2:], line, dept_code)
+            start, end = (0, min(indices, default=len(line))) if transform[1] == 'start' else (max(indices, default=0), len(line))
+            result.append(line[:start] + line[end:])
+        else:
+            for start, end in sorted(reference_matches(transform[1], line, dept_code), reverse=True):
+                line = line[:start] + reference_text(transform[2], dept_code) + line[end:]
+            result.append(line)
+    return result
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_pipelines(seed):
+    rng = Random(seed)
+    catalog = get_catalog(rng.sample(sorted(CODE2NAME), rng.randint(1, 4)))
+    transforms = [random_transform(rng) for _ in range(rng.randint(1, 5))]
+    pipeline = compile_pipeline(transforms)
+    for description in catalog:
+        expected = list(description.text)
+        stepped = description
+        for transform in transforms:
+            expected = reference_transform(transform, expected, description.dept_code)
+            stepped = dispatch_transform(transform, stepped)
+            assert list(stepped.text) == expected
+            # each run_* function applies only its own transform
+            assert list(RUN_TRANSFORMS[transform[0]](transform, stepped).text) == reference_transform(
+                transform, expected, description.dept_code
+            )
+        assert list(pipeline(description).text) == expected
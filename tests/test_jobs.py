@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from flask import Blueprint, Flask
+
+from appoxy import jobs
+from appoxy.jobs import add_job_routes, job_store
+
+
+def echo(data, progress=None):
+    return data
+
+
+@pytest.fixture
+def jobs_client():
+    blueprint = Blueprint('echo', __name__, url_prefix='/echo')
+    add_job_routes(blueprint, echo)
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(blueprint)
+    return flask_app.test_client()
+
+
+def create_job(**columns):
+    job_id = job_store.create('echo')
+    if columns:
+        job_store.update(job_id, **columns)
+    return job_id
+
+
+def test_reject_huge_job(client):
+    data = {'demographics': [['B'] * 40 for _ in range(40)], 'num_districts': 2}
+    response = client.post('/dyna_prog/jobs', data=json.dumps(data))
+    assert response.status_code == 413
+
+
+def test_stream_abandoned_job(jobs_client):
+    job_id = create_job(status='running', created=0)
+    response = jobs_client.get(f'/echo/jobs/{job_id}/result', headers={'Accept': 'text/event-stream'})
+    events = response.get_data(as_text=True)
+    assert '"status": "failed"' in events
+    assert job_store.get(job_id)['status'] == 'failed'
+
+
+def test_stream_expired_job():
+    events = list(jobs._stream_job('no-such-job'))
+    assert len(events) == 1
+    assert events[0].startswith('event: error\n')
+
+
+def test_abandoned_job_status(jobs_client):
+    job_id = create_job(status='queued', created=0)
+    response = jobs_client.get(f'/echo/jobs/{job_id}')
+    assert response.get_json()['status'] == 'failed'
+    job_id = create_job(status='running')
+    response = jobs_client.get(f'/echo/jobs/{job_id}')
+    assert response.get_json()['status'] == 'running'
+
+
+def test_failed_job_result(jobs_client):
+    job_id = create_job(status='failed', error='the job exited without a result')
+    response = jobs_client.get(f'/echo/jobs/{job_id}/result')
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'the job exited without a result'
+
+
+def test_pending_and_done_job_results(jobs_client):
+    job_id = create_job(status='running')
+    assert jobs_client.get(f'/echo/jobs/{job_id}/result').status_code == 202
+    job_store.update(job_id, status='done', result=json.dumps({'answer': 42}))
+    response = jobs_client.get(f'/echo/jobs/{job_id}/result')
+    assert response.status_code == 200
+    assert response.get_json() == {'answer': 42}
+
+
+def test_submit_not_json(jobs_client):
+    response = jobs_client.post('/echo/jobs', data='not json')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'The job must be JSON.'
@@ -0,0 +1,48 @@
+import json
+import os
+from time import sleep
+
+import pytest
+
+from appoxy.pool import JobTimeout, SolverPool
+
+
+def double(number):
+    return os.getpid(), 2 * number
+
+
+def fail():
+    raise ValueError('failed')
+
+
+def test_workers_are_reused():
+    pool = SolverPool(max_workers=1, max_queue=1, timeout=30)
+    first_pid, result = pool.run(double, 1)
+    assert result == 2
+    second_pid, result = pool.run(double, 2)
+    assert result == 4
+    assert first_pid == second_pid != os.getpid()
+
+
+def test_timeout_replaces_worker():
+    pool = SolverPool(max_workers=1, max_queue=1, timeout=30)
+    first_pid, _ = pool.run(double, 1)
+    with pytest.raises(JobTimeout):
+        pool.run(sleep, 5, timeout=0.5)
+    second_pid, result = pool.run(double, 3)
+    assert result == 6
+    assert second_pid != first_pid
+
+
+def test_exceptions_are_raised():
+    pool = SolverPool(max_workers=1, max_queue=1, timeout=30)
+    with pytest.raises(ValueError):
+        pool.run(fail)
+    assert pool.run(double, 1)[1] == 2
+
+
+def test_solve_in_worker(client):
+    data = {'demographics': [['B', 'R'], ['R', 'B']], 'num_districts': 2}
+    response = client.post('/dyna_prog/solve', data=json.dumps(data))
+    assert response.status_code == 200
+    assert json.loads(response.get_data())['num_districts'] == 2